@@ -1,5 +1,6 @@
 import os
 from flask import Flask, render_template
+from audit import setup_logging
 import tkinter as tk
 import threading
 from ui import VoiceAuthUI
@@ -9,7 +10,8 @@ from database import init_db
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'your-secret-key')  # Use environment variable for security
 
-# Initialize database
+# Configure logging once for every module, then initialize database
+setup_logging()
 init_db()
 
 # Initialize Tkinter, AuthHandler, and VoiceAuthUI
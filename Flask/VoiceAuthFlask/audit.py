@@ -0,0 +1,161 @@
+import json
+import queue
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+LOG_FILE = "auth.log"
+AUDIT_FILE = "audit.log"
+LOG_FORMAT = '%(asctime)s:%(levelname)s:%(message)s'
+AUDIT_LOGGER = "voiceauth.audit"
+
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 5
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 0.5
+
+_STOP = object()
+_writer = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Format audit records as one JSON object per line."""
+
+    def format(self, record):
+        event = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "event": record.getMessage(),
+        }
+        event.update(getattr(record, "audit", {}))
+        return json.dumps(event, default=str)
+
+
+class BatchedRotatingFileHandler(RotatingFileHandler):
+    """Size-rotated file handler that writes a batch of records with a single flush."""
+
+    def emit_batch(self, records):
+        if not records:
+            return
+        self.acquire()
+        try:
+            for record in records:
+                try:
+                    if self.shouldRollover(record):
+                        self.doRollover()
+                    if self.stream is None:
+                        self.stream = self._open()
+                    self.stream.write(self.format(record) + self.terminator)
+                except Exception:
+                    self.handleError(record)
+            if self.stream:
+                self.stream.flush()
+        finally:
+            self.release()
+
+
+class _AuditFilter(logging.Filter):
+    def __init__(self, audit):
+        super().__init__()
+        self.audit = audit
+
+    def filter(self, record):
+        return record.name.startswith(AUDIT_LOGGER) == self.audit
+
+
+class _BatchWriter(threading.Thread):
+    """Drain the log queue in batches and hand them to the file handlers."""
+
+    def __init__(self, log_queue, handlers, batch_size, flush_interval):
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            record = self.queue.get()
+            if record is _STOP:
+                break
+            batch = [record]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    record = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+            self._write(batch)
+
+    def _write(self, batch):
+        for handler in self.handlers:
+            records = [record for record in batch
+                       if record.levelno >= handler.level and handler.filter(record)]
+            handler.emit_batch(records)
+
+    def stop(self):
+        self.queue.put(_STOP)
+        self.join(timeout=5)
+        for handler in self.handlers:
+            handler.close()
+
+
+def setup_logging(log_file=LOG_FILE, audit_file=AUDIT_FILE, level=logging.INFO, max_bytes=MAX_BYTES,
+                  backup_count=BACKUP_COUNT, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+    """Route all logging through a queue to a background batch writer.
+
+    This is the single configuration point for the application: plain log lines
+    go to log_file, audit events (see audit_event) go to audit_file as JSON lines.
+    Calling it again is a no-op.
+    """
+    global _writer
+    with _setup_lock:
+        if _writer is not None:
+            return
+        text_handler = BatchedRotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+        text_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        text_handler.addFilter(_AuditFilter(audit=False))
+        audit_handler = BatchedRotatingFileHandler(audit_file, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+        audit_handler.setFormatter(JsonFormatter())
+        audit_handler.addFilter(_AuditFilter(audit=True))
+
+        log_queue = queue.SimpleQueue()
+        _writer = _BatchWriter(log_queue, [text_handler, audit_handler], batch_size, flush_interval)
+        _writer.start()
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(QueueHandler(log_queue))
+        root.setLevel(level)
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush pending records and stop the background writer."""
+    global _writer
+    with _setup_lock:
+        if _writer is None:
+            return
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if isinstance(handler, QueueHandler):
+                root.removeHandler(handler)
+        _writer.stop()
+        _writer = None
+
+
+def audit_event(event, **fields):
+    """Record a structured audit event (login_success, voice_score, ...)."""
+    logging.getLogger(AUDIT_LOGGER).info(event, extra={"audit": fields})
@@ -2,36 +2,49 @@ import os
 import numpy as np
 import librosa
 import speech_recognition as sr
-import cv2
-from fastdtw import fastdtw
-from scipy.spatial.distance import euclidean
 import soundfile as sf
-from fuzzywuzzy import fuzz
 from cryptography.fernet import Fernet
-from datetime import datetime
 import logging
 from PIL import Image, ImageTk
-from tkinter import messagebox
 import time
-from database import save_user_data, get_user_data
-
-# Setup logging
-logging.basicConfig(filename="auth.log", level=logging.INFO, format='%(asctime)s:%(levelname)s:%(message)s')
+from concurrent.futures import TimeoutError as FutureTimeout
+from database import save_user_data, get_user_data, DEFAULT_TENANT
+from cascade import VerificationCascade
+from audit import audit_event
+from intruder import IntruderEvidence
+from rate_limit import default_limiter, default_source_limiter, default_source
+from phrase_match import PhraseMatcher
+from calibration import ScoreHistory, ThresholdCalibrator
+from template_store import quantize_template, dequantize_template, DEFAULT_DTYPE
+from normalization import apply_cmvn, compute_cmvn_stats, serialize_cmvn_stats, deserialize_cmvn_stats
+
+# How long a failure dialog waits for the intruder capture so it can report the outcome
+CAPTURE_WAIT = 2.0
 
 class AuthHandler:
-    def __init__(self):
+    def __init__(self, use_user_cmvn=True, tenant=DEFAULT_TENANT, ui=None, source=None, phrase_mode="ratio",
+                 template_dtype=DEFAULT_DTYPE, store_voice_wav=False):
         self.recognizer = sr.Recognizer()
+        self.ui = ui
         self.intruder_photo = None
+        self.intruder_evidence = IntruderEvidence()
         self.status_text = None
+        self.cascade = VerificationCascade()
+        self.use_user_cmvn = use_user_cmvn
+        self.tenant = tenant
+        self.source = source or default_source()
+        self.limiter = default_limiter()
+        self.source_limiter = default_source_limiter()
+        self.phrase_matcher = PhraseMatcher(mode=phrase_mode)
+        self.score_history = ScoreHistory(tenant)
+        self.calibrator = ThresholdCalibrator(self.score_history)
+        self.template_dtype = template_dtype
+        self.store_voice_wav = store_voice_wav
 
     def log_status(self, message, status_text):
-        """Update status text area with a new message."""
-        if status_text and status_text.winfo_exists():
-            status_text.text.configure(state='normal')
-            status_text.text.insert("end", f"{datetime.now().strftime('%H:%M:%S')}: {message}\n")
-            status_text.text.see("end")
-            status_text.text.configure(state='disabled')
-            status_text.update()
+        """Publish a status line to the UI and the log."""
+        if self.ui and status_text:
+            self.ui.status(status_text, message)
         logging.info(message)
 
     def save_encrypted_phrase(self, phrase):
@@ -54,8 +67,24 @@ class AuthHandler:
             self.log_status(f"Error decrypting phrase: {e}", self.status_text)
             return None
 
-    def extract_features(self, audio_data):
-        """Extract and normalize MFCC features from audio data."""
+    def user_cmvn_stats(self, cmvn_data):
+        """Per-user CMVN statistics from the users row, or None for per-clip normalization.
+
+        A probe has to be normalized the way the user's template was built, so this
+        follows what signup stored rather than use_user_cmvn: statistics are only
+        saved for users enrolled with use_user_cmvn on.
+        """
+        return deserialize_cmvn_stats(cmvn_data)
+
+    def extract_features(self, audio_data, cmvn_stats=None):
+        """Extract MFCC features and apply CMVN (per-clip unless stats are given)."""
+        mfccs = self.extract_mfcc(audio_data)
+        if mfccs is None:
+            return None
+        return apply_cmvn(mfccs, cmvn_stats)
+
+    def extract_mfcc(self, audio_data):
+        """Extract raw MFCC frames (frames x coefficients) from audio data."""
         temp_file = None
         try:
             if isinstance(audio_data, bytes):
@@ -80,11 +109,7 @@ class AuthHandler:
                 self.log_status("Error: MFCC extraction resulted in empty features.", self.status_text)
                 return None
 
-            mfccs = mfccs.T
-            mfccs_min = np.min(mfccs, axis=0)
-            mfccs_max = np.max(mfccs, axis=0)
-            mfccs = (mfccs - mfccs_min) / (mfccs_max - mfccs_min + 1e-8)
-            return mfccs
+            return mfccs.T
         except Exception as e:
             self.log_status(f"Error extracting features: {str(e)}", self.status_text)
             return None
@@ -118,25 +143,37 @@ class AuthHandler:
                     self.log_status(f"Error cleaning up temp file: {e}", self.status_text)
 
     def save_average_voice(self, audio1, audio2):
-        """Average MFCC features from two audio data for signup."""
-        feats1 = self.extract_features(audio1)
-        feats2 = self.extract_features(audio2)
-        if feats1 is None or feats2 is None:
-            return None
+        """Average MFCC features from two audio data for signup.
+
+        Returns the resynthesized voice WAV (None unless store_voice_wav is set), the
+        serialized CMVN statistics of both samples (None when use_user_cmvn is off and
+        each sample is normalized on its own) and the quantized feature template.
+        """
+        raw1 = self.extract_mfcc(audio1)
+        raw2 = self.extract_mfcc(audio2)
+        if raw1 is None or raw2 is None:
+            return None, None, None
+        cmvn_stats = compute_cmvn_stats(np.vstack((raw1, raw2))) if self.use_user_cmvn else None
+        feats1 = apply_cmvn(raw1, cmvn_stats)
+        feats2 = apply_cmvn(raw2, cmvn_stats)
         max_len = max(len(feats1), len(feats2))
         feats1 = np.pad(feats1, ((0, max_len - len(feats1)), (0, 0)), mode='mean')
         feats2 = np.pad(feats2, ((0, max_len - len(feats2)), (0, 0)), mode='mean')
         avg_feats = (feats1 + feats2) / 2
+        cmvn_data = serialize_cmvn_stats(cmvn_stats) if cmvn_stats is not None else None
+        template_data = quantize_template(avg_feats, self.template_dtype)
+        if not self.store_voice_wav:
+            return None, cmvn_data, template_data
         temp_file = 'temp.wav'
         try:
             y_inv = librosa.feature.inverse.mfcc_to_audio(avg_feats.T, n_mels=13, sr=22050)
             sf.write(temp_file, y_inv, 22050)
             with open(temp_file, 'rb') as f:
                 voice_data = f.read()
-            return voice_data
+            return voice_data, cmvn_data, template_data
         except Exception as e:
             self.log_status(f"Error saving averaged voice: {e}", self.status_text)
-            return None
+            return None, None, None
         finally:
             if os.path.exists(temp_file):
                 try:
@@ -165,69 +202,95 @@ class AuthHandler:
                 self.log_status(f"Error recording audio: {e}", self.status_text)
                 return None
 
-    def capture_intruder(self, image_label):
-        """Capture intruder photo using webcam."""
+    def capture_intruder(self, image_label, email=None):
+        """Queue an intruder photo capture; returns a Future without waiting on the camera."""
         self.log_status("Capturing intruder photo...", self.status_text)
-        cam = cv2.VideoCapture(0)
-        if not cam.isOpened():
-            self.log_status("Camera not available.", self.status_text)
-            return
-        try:
-            for _ in range(10):
-                cam.read()
-                time.sleep(0.1)
-            ret, frame = cam.read()
-            if ret:
-                os.makedirs("static", exist_ok=True)
-                cv2.imwrite("static/intruder.jpg", frame)
-                self.log_status("Intruder photo saved.", self.status_text)
-                img = Image.open("static/intruder.jpg")
-                img = img.resize((200, 150), Image.Resampling.LANCZOS)
-                self.intruder_photo = ImageTk.PhotoImage(img)
-                if image_label and image_label.winfo_exists():
-                    image_label.config(image=self.intruder_photo, text="")
+        status_text = self.status_text
+
+        def on_saved(path, thumbnail):
+            if self.ui and image_label:
+                self.ui.post(self._show_intruder_photo, image_label, Image.fromarray(thumbnail))
+
+        def on_done(future):
+            path = None if future.exception() else future.result()
+            if path:
+                self.log_status(f"Intruder photo saved to {path}.", status_text)
             else:
-                self.log_status("Failed to capture image.", self.status_text)
-        except Exception as e:
-            self.log_status(f"Error capturing intruder photo: {e}", self.status_text)
-        finally:
-            cam.release()
+                self.log_status("Failed to capture intruder photo.", status_text)
+            audit_event("intruder_capture", email=email, saved=path is not None, path=path)
+            # The evidence is taken; stop reading frames instead of waiting for the idle timeout
+            self.intruder_evidence.camera.release()
+
+        future = self.intruder_evidence.capture(email, on_saved)
+        future.add_done_callback(on_done)
+        return future
 
-    def match_voice(self, stored_voice_data):
-        """Compare recorded voice with stored sample."""
-        if not stored_voice_data:
+    def capture_outcome(self, future, timeout=CAPTURE_WAIT):
+        """Wait briefly for a capture and describe its outcome for a dialog."""
+        try:
+            path = future.result(timeout=timeout)
+        except FutureTimeout:
+            return "An intruder photo is being taken."
+        except Exception:
+            path = None
+        return "Intruder photo captured." if path else "No intruder photo could be taken."
+
+    def _show_intruder_photo(self, image_label, img):
+        """Display a captured intruder image; runs on the Tk main loop."""
+        if image_label.winfo_exists():
+            self.intruder_photo = ImageTk.PhotoImage(img)
+            image_label.config(image=self.intruder_photo, text="")
+
+    def match_voice(self, stored_voice_data, cmvn_stats=None, email=None, template=None):
+        """Compare recorded voice with the stored template, or the stored sample for older users.
+
+        Returns (matched, DTW distance); the distance is None unless the full DTW
+        stage decided, since earlier stages only report bounds.
+        """
+        if template is None and not stored_voice_data:
             self.log_status("No authorized voice sample found for this email.", self.status_text)
-            return False
+            return False, None
 
         audio_data = self.record_audio("Recording voice for authentication...", return_data=True)
         if not audio_data:
-            return False
+            return False, None
 
         temp_stored = None
         temp_test = None
         try:
-            temp_stored = "temp_stored.wav"
             temp_test = "temp_test.wav"
-            with open(temp_stored, 'wb') as f:
-                f.write(stored_voice_data)
             with open(temp_test, 'wb') as f:
                 f.write(audio_data)
+            test_features = self.extract_features(temp_test, cmvn_stats)
 
-            auth_features = self.extract_features(temp_stored)
-            test_features = self.extract_features(temp_test)
+            if template is not None:
+                # Templates hold features already normalized with the user's statistics
+                auth_features = template
+            else:
+                # The stored sample is resynthesized from normalized features, so it is
+                # normalized against itself; the live probe uses the user's statistics.
+                temp_stored = "temp_stored.wav"
+                with open(temp_stored, 'wb') as f:
+                    f.write(stored_voice_data)
+                auth_features = self.extract_features(temp_stored)
 
             if auth_features is None or test_features is None:
-                return False
-
-            distance, _ = fastdtw(auth_features, test_features, dist=euclidean)
-            self.log_status(f"Voice Match Score: {distance:.2f}", self.status_text)
-            if distance >= 500:
+                return False, None
+
+            threshold = self.calibrator.voice_threshold(email)
+            accepted, distance, stage = self.cascade.verify(auth_features, test_features, dtw_threshold=threshold)
+            # Early stages report bounds, not DTW distances, so only full scores feed calibration
+            score = distance if stage == "full" else None
+            self.log_status(f"Voice Match Score: {distance:.2f} ({stage} stage, threshold {threshold:.2f})", self.status_text)
+            audit_event("voice_score", email=email, distance=round(distance, 3), stage=stage,
+                        threshold=round(threshold, 3), accepted=accepted)
+            if not accepted:
                 self.log_status("Voice mismatch. Try speaking clearly, closer to the microphone.", self.status_text)
-                return False
-            return True
+                return False, score
+            return True, score
         except Exception as e:
             self.log_status(f"Error matching voice: {e}", self.status_text)
-            return False
+            return False, None
         finally:
             for temp_file in [temp_stored, temp_test]:
                 if temp_file and os.path.exists(temp_file):
@@ -236,165 +299,201 @@ class AuthHandler:
                     except Exception as e:
                         self.log_status(f"Error cleaning up temp file: {e}", self.status_text)
 
-    def verify_phrase(self, key_data, phrase_data):
-        """Verify spoken phrase against stored phrase."""
+    def verify_phrase(self, key_data, phrase_data, email=None):
+        """Verify spoken phrase against stored phrase; returns (matched, similarity or None)."""
         audio = self.record_audio("Speak your unlock phrase...", return_data=False)
         if not audio:
-            return False
+            return False, None
 
         try:
-            spoken_phrase = self.recognizer.recognize_google(audio).strip().lower()
-            stored_phrase = self.load_encrypted_phrase(key_data, phrase_data)
-            if stored_phrase is None:
-                return False
-            similarity = fuzz.ratio(spoken_phrase, stored_phrase)
-            self.log_status(f"Phrase Similarity: {similarity}%", self.status_text)
-            return similarity > 90
+            spoken_phrase = self.recognizer.recognize_google(audio)
+            stored_form = self.phrase_matcher.stored_form(
+                email, phrase_data, lambda: self.load_encrypted_phrase(key_data, phrase_data))
+            if stored_form is None:
+                return False, None
+            similarity = self.phrase_matcher.score(spoken_phrase, stored_form)
+            threshold = self.calibrator.phrase_threshold(email)
+            self.log_status(f"Phrase Similarity: {similarity:.0f}% (threshold {threshold:.0f}%)", self.status_text)
+            audit_event("phrase_score", email=email, similarity=round(similarity, 1),
+                        threshold=round(threshold, 1), accepted=similarity > threshold)
+            return similarity > threshold, similarity
         except Exception as e:
             self.log_status(f"Error recognizing phrase: {e}", self.status_text)
+            return False, None
+
+    def _limit_key(self, email):
+        return f"email:{self.tenant}:{email}"
+
+    def _throttled(self, email, status_text, window):
+        """Consume a verification attempt; warn the user and return True if it is not allowed."""
+        # The source is only throttled; failures and lockouts are tracked per email
+        allowed, retry_after = self.source_limiter.check(f"source:{self.source}")
+        if allowed:
+            allowed, retry_after = self.limiter.check(self._limit_key(email))
+        if allowed:
             return False
+        self.log_status(f"Too many attempts. Try again in {retry_after:.0f} seconds.", status_text)
+        audit_event("attempt_throttled", email=email, tenant=self.tenant, source=self.source,
+                    retry_after=round(retry_after, 1))
+        self.ui.message("showwarning", "Too Many Attempts",
+                        f"Too many verification attempts. Try again in {int(retry_after) + 1} seconds.", parent=window)
+        return True
 
     def run_signup(self, email, status_text, progress_bar, window, image_label):
         """Perform signup process with two voice samples and a secret phrase."""
         self.status_text = status_text
         self.log_status(f"Starting signup process for {email}...", status_text)
         try:
-            progress_bar.pack(pady=10)
-            progress_bar["value"] = 0
-            window.update()
+            self.ui.progress(progress_bar, 0)
 
             audio1 = self.record_audio("Recording first voice sample... Speak any sentence.")
             if not audio1:
-                messagebox.showerror("Error", "Voice recording failed. Please try again.", parent=window)
+                self.ui.message("showerror", "Error", "Voice recording failed. Please try again.", parent=window)
                 self.log_status("Signup failed due to voice recording error.", status_text)
                 return False
-            progress_bar["value"] = 25
-            window.update()
+            self.ui.progress(progress_bar, 25)
 
             audio2 = self.record_audio("Recording second voice sample... Speak another sentence.")
             if not audio2:
-                messagebox.showerror("Error", "Voice recording failed. Please try again.", parent=window)
+                self.ui.message("showerror", "Error", "Voice recording failed. Please try again.", parent=window)
                 self.log_status("Signup failed due to voice recording error.", status_text)
                 return False
-            progress_bar["value"] = 50
-            window.update()
+            self.ui.progress(progress_bar, 50)
 
-            voice_data = self.save_average_voice(audio1, audio2)
-            if not voice_data:
-                messagebox.showerror("Error", "Voice processing failed. Please try again.", parent=window)
+            voice_data, cmvn_data, template_data = self.save_average_voice(audio1, audio2)
+            if not template_data:
+                self.ui.message("showerror", "Error", "Voice processing failed. Please try again.", parent=window)
                 self.log_status("Signup failed due to voice processing error.", status_text)
                 return False
-            progress_bar["value"] = 75
-            window.update()
+            self.ui.progress(progress_bar, 75)
 
             audio = self.record_audio("Speak your secret unlock phrase (e.g., 'Open my phone')...", return_data=False)
             if not audio:
-                messagebox.showerror("Error", "Phrase recording failed. Please try again.", parent=window)
+                self.ui.message("showerror", "Error", "Phrase recording failed. Please try again.", parent=window)
                 self.log_status("Signup failed due to phrase recording error.", status_text)
                 return False
 
             try:
                 phrase = self.recognizer.recognize_google(audio)
             except sr.UnknownValueError:
-                messagebox.showerror("Error", "Could not understand the phrase. Please try again.", parent=window)
+                self.ui.message("showerror", "Error", "Could not understand the phrase. Please try again.", parent=window)
                 self.log_status("Signup failed due to unrecognizable phrase.", status_text)
                 return False
             except sr.RequestError as e:
-                messagebox.showerror("Error", "Speech recognition service error. Please check your internet connection.", parent=window)
+                self.ui.message("showerror", "Error", "Speech recognition service error. Please check your internet connection.", parent=window)
                 self.log_status(f"Signup failed due to speech recognition error: {e}", status_text)
                 return False
 
             phrase_data, key_data = self.save_encrypted_phrase(phrase)
             if not phrase_data or not key_data:
-                messagebox.showerror("Error", "Encryption failed. Please try again.", parent=window)
+                self.ui.message("showerror", "Error", "Encryption failed. Please try again.", parent=window)
                 self.log_status("Signup failed due to encryption error.", status_text)
                 return False
 
-            save_user_data(email, voice_data, phrase_data, key_data)
-            progress_bar["value"] = 100
-            window.update()
+            save_user_data(email, voice_data, phrase_data, key_data, cmvn_data, tenant=self.tenant,
+                           template_data=template_data)
+            # A new enrollment makes the old genuine scores meaningless
+            self.score_history.reset(email)
+            self.ui.progress(progress_bar, 100)
             time.sleep(0.5)
             self.log_status("Signup completed successfully!", status_text)
-            messagebox.showinfo("Success", "Signup completed successfully!", parent=window)
+            audit_event("signup_success", email=email, tenant=self.tenant)
+            self.ui.message("showinfo", "Success", "Signup completed successfully!", parent=window)
             return True
         except Exception as e:
-            messagebox.showerror("Error", f"Signup failed: {str(e)}", parent=window)
+            self.ui.message("showerror", "Error", f"Signup failed: {str(e)}", parent=window)
             self.log_status(f"Signup failed: {str(e)}", status_text)
             return False
         finally:
-            progress_bar.pack_forget()
-            window.destroy()
-            window.master.deiconify()
+            self.ui.hide_progress(progress_bar)
+            self.ui.close_window(window)
 
     def run_login(self, email, status_text, progress_bar, window, image_label):
         """Perform login with one voice sample and secret phrase."""
         self.status_text = status_text
         self.log_status(f"Starting login for {email}...", status_text)
         try:
-            user_data = get_user_data(email)
+            # Shed throttled clients before any database or audio work
+            if self._throttled(email, status_text, window):
+                return False
+            user_data = get_user_data(email, self.tenant)
             if not user_data:
-                messagebox.showerror("Error", "No user data found. Please sign up first.", parent=window)
+                self.ui.message("showerror", "Error", "No user data found. Please sign up first.", parent=window)
                 self.log_status("No user data found for this email.", status_text)
                 return False
 
-            voice_data, phrase_data, key_data = user_data
+            voice_data, phrase_data, key_data, cmvn_data, template_data = user_data
+            cmvn_stats = self.user_cmvn_stats(cmvn_data)
+            template = dequantize_template(template_data)
             max_attempts = 3
+            # Scores from a session that ends in success are treated as genuine
+            session_voice_scores, session_phrase_scores = [], []
             for attempt in range(max_attempts):
+                if attempt > 0:
+                    if self._throttled(email, status_text, window):
+                        return False
+                    # Only open the camera once an attempt has failed; it warms up while
+                    # the next attempt records, so a capture after the last one is instant.
+                    self.intruder_evidence.camera.warm()
                 self.log_status(f"Attempt {attempt + 1}/{max_attempts}", status_text)
-                progress_bar.pack(pady=10)
-                progress_bar["value"] = 0
-                window.update()
+                self.ui.progress(progress_bar, 0)
 
                 audio_data = self.record_audio("Recording voice sample for login...")
                 if not audio_data:
-                    messagebox.showerror("Error", "Voice recording failed. Please try again.", parent=window)
+                    self.ui.message("showerror", "Error", "Voice recording failed. Please try again.", parent=window)
                     self.log_status("Login failed due to voice recording error.", status_text)
-                    progress_bar.pack_forget()
+                    self.ui.hide_progress(progress_bar)
                     continue
 
-                progress_bar["value"] = 50
-                window.update()
+                self.ui.progress(progress_bar, 50)
 
-                voice_ok = self.match_voice(voice_data)
+                voice_ok, voice_score = self.match_voice(voice_data, cmvn_stats, email=email, template=template)
+                if voice_score is not None:
+                    session_voice_scores.append(voice_score)
                 if not voice_ok:
                     self.log_status("Voice authentication failed.", status_text)
-                    progress_bar.pack_forget()
+                    self.limiter.record_failure(self._limit_key(email))
+                    self.ui.hide_progress(progress_bar)
                     continue
 
-                progress_bar["value"] = 75
-                window.update()
+                self.ui.progress(progress_bar, 75)
 
-                phrase_ok = self.verify_phrase(key_data, phrase_data)
+                phrase_ok, phrase_score = self.verify_phrase(key_data, phrase_data, email=email)
+                if phrase_score is not None:
+                    session_phrase_scores.append(phrase_score)
                 if not phrase_ok:
                     self.log_status("Phrase authentication failed.", status_text)
-                    progress_bar.pack_forget()
+                    self.limiter.record_failure(self._limit_key(email))
+                    self.ui.hide_progress(progress_bar)
                     continue
 
-                progress_bar["value"] = 100
-                window.update()
+                self.ui.progress(progress_bar, 100)
                 time.sleep(0.5)
                 self.log_status("Access Granted! Opening success page...", status_text)
-                logging.info(f"Authentication successful for {email} at {datetime.now()}")
+                audit_event("login_success", email=email, tenant=self.tenant, attempt=attempt + 1)
+                self.limiter.record_success(self._limit_key(email))
+                self.intruder_evidence.camera.release()
+                self.score_history.record(email, "voice", session_voice_scores)
+                self.score_history.record(email, "phrase", session_phrase_scores)
                 try:
                     import webbrowser
                     webbrowser.open("http://127.0.0.1:5000/success")
                 except Exception as e:
-                    messagebox.showwarning("Warning", "Authentication succeeded, but failed to open success page.", parent=window)
+                    self.ui.message("showwarning", "Warning", "Authentication succeeded, but failed to open success page.", parent=window)
                     self.log_status(f"Error opening success page: {e}", status_text)
                 return True
             self.log_status("Max attempts reached. Capturing intruder photo...", status_text)
-            self.capture_intruder(image_label)
-            logging.info(f"Authentication failed for {email} at {datetime.now()}")
-            messagebox.showwarning("Failed", "Login failed. Intruder photo captured.", parent=window)
+            audit_event("login_failure", email=email, tenant=self.tenant, attempts=max_attempts)
+            capture = self.capture_intruder(image_label, email=email)
+            self.ui.message("showwarning", "Failed", f"Login failed. {self.capture_outcome(capture)}", parent=window)
             return False
         except Exception as e:
-            messagebox.showerror("Error", f"Login failed: {str(e)}", parent=window)
+            self.ui.message("showerror", "Error", f"Login failed: {str(e)}", parent=window)
             self.log_status(f"Login failed: {str(e)}", status_text)
             return False
         finally:
-            progress_bar.pack_forget()
-            window.destroy()
-            window.master.deiconify()
+            self.ui.hide_progress(progress_bar)
+            self.ui.close_window(window)
 
     def run_password_reset(self, email, status_text, progress_bar, window, image_label):
         """Reset voice setup with OTP verification."""
@@ -404,52 +503,52 @@ class AuthHandler:
         self.status_text = status_text
         self.log_status(f"Starting password reset for {email}...", status_text)
         try:
-            user_data = get_user_data(email)
+            if self._throttled(email, status_text, window):
+                return False
+            user_data = get_user_data(email, self.tenant)
             if not user_data:
-                messagebox.showerror("Error", "Email not found in the system.", parent=window)
+                self.ui.message("showerror", "Error", "Email not found in the system.", parent=window)
                 self.log_status("Reset failed: User not found.", status_text)
                 return False
 
-            progress_bar.pack(pady=10)
-            progress_bar["value"] = 0
-            window.update()
+            self.ui.progress(progress_bar, 0)
 
             otp = send_otp(email)
             if not otp:
-                messagebox.showerror("Error", "Failed to send OTP. Check your email setup.", parent=window)
+                self.ui.message("showerror", "Error", "Failed to send OTP. Check your email setup.", parent=window)
                 self.log_status("Reset failed: OTP not sent.", status_text)
-                progress_bar.pack_forget()
+                self.ui.hide_progress(progress_bar)
                 return False
 
-            progress_bar["value"] = 50
-            window.update()
+            self.ui.progress(progress_bar, 50)
 
-            user_input = simpledialog.askstring("OTP Verification", "Enter the OTP sent to your email:", parent=window)
+            user_input = self.ui.call(simpledialog.askstring, "OTP Verification", "Enter the OTP sent to your email:", parent=window)
             if user_input != otp:
                 self.log_status("Incorrect OTP. Capturing intruder photo...", status_text)
-                self.capture_intruder(image_label)
-                messagebox.showerror("Error", "Incorrect OTP. Intruder alert!", parent=window)
-                progress_bar.pack_forget()
+                audit_event("otp_failure", email=email, tenant=self.tenant)
+                self.limiter.record_failure(self._limit_key(email))
+                capture = self.capture_intruder(image_label, email=email)
+                self.ui.message("showerror", "Error", f"Incorrect OTP. Intruder alert! {self.capture_outcome(capture)}",
+                                parent=window)
+                self.ui.hide_progress(progress_bar)
                 return False
 
             self.log_status("OTP verified. Starting setup phase.", status_text)
-            progress_bar["value"] = 75
-            window.update()
+            self.ui.progress(progress_bar, 75)
 
             # Run signup process to reset voice and phrase
             success = self.run_signup(email, status_text, progress_bar, window, image_label)
             if success:
                 self.log_status("Password reset completed successfully!", status_text)
-                messagebox.showinfo("Success", "Password reset completed successfully!", parent=window)
+                self.ui.message("showinfo", "Success", "Password reset completed successfully!", parent=window)
             else:
                 self.log_status("Password reset failed during signup.", status_text)
-                messagebox.showerror("Error", "Password reset failed. Please try again.", parent=window)
+                self.ui.message("showerror", "Error", "Password reset failed. Please try again.", parent=window)
             return success
         except Exception as e:
-            messagebox.showerror("Error", f"Password reset failed: {str(e)}", parent=window)
+            self.ui.message("showerror", "Error", f"Password reset failed: {str(e)}", parent=window)
             self.log_status(f"Password reset failed: {str(e)}", status_text)
             return False
         finally:
-            progress_bar.pack_forget()
-            window.destroy()
-            window.master.deiconify()
\ No newline at end of file
+            self.ui.hide_progress(progress_bar)
+            self.ui.close_window(window)
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""Tune and check the verification cascade thresholds.
+
+Scores genuine and impostor pairs through every cascade stage and reports, per
+stage, the genuine and impostor score distributions, how many pairs the current
+threshold rejects and the time per call. Enrollment and probing follow the app:
+the template averages two clips normalized with the user's CMVN statistics, and
+every probe, genuine or not, is normalized with the claimed user's statistics.
+
+With a directory argument it uses real recordings laid out as
+<dir>/<speaker>/*.wav (at least three clips per speaker; needs librosa and
+soundfile). Without one it uses synthetic MFCC sequences, which are only good
+for checking that the stages behave, not for picking production thresholds.
+
+    python bench_cascade.py [recordings_dir | synthetic speaker count]
+"""
+import os
+import sys
+import time
+import numpy as np
+import cascade
+from normalization import compute_cmvn_stats, apply_cmvn
+
+COEFFS = 13
+# Rough spread of raw MFCC coefficients; c0 (energy) varies the most
+CONTENT_SCALE = np.array([60, 35, 22, 16, 13, 11, 10, 9, 8, 7, 6, 6, 5], dtype=float)
+PHONES = 40
+PROBES = 3
+
+
+def enroll(clip1, clip2):
+    """Template and CMVN statistics the way save_average_voice builds them."""
+    stats = compute_cmvn_stats(np.vstack((clip1, clip2)))
+    feats1, feats2 = apply_cmvn(clip1, stats), apply_cmvn(clip2, stats)
+    max_len = max(len(feats1), len(feats2))
+    feats1 = np.pad(feats1, ((0, max_len - len(feats1)), (0, 0)), mode='mean')
+    feats2 = np.pad(feats2, ((0, max_len - len(feats2)), (0, 0)), mode='mean')
+    return (feats1 + feats2) / 2, stats
+
+
+def synthetic_speakers(count, seed=7):
+    """Per speaker, a few raw MFCC clips of the same sentence with varied timing.
+
+    Each speaker has a vocal-tract offset and gain on a shared phone inventory;
+    clips add channel and frame noise.
+    """
+    rng = np.random.default_rng(seed)
+    phones = rng.standard_normal((PHONES, COEFFS)) * CONTENT_SCALE
+    phones[:, 0] -= 250
+    kernel = np.ones(5) / 5
+
+    def clip(offset, gain, sentence):
+        frames = np.repeat(phones[sentence], rng.integers(5, 12, len(sentence)), axis=0)
+        frames = np.apply_along_axis(lambda c: np.convolve(c, kernel, mode='same'), 0, frames)
+        channel = rng.standard_normal(COEFFS) * CONTENT_SCALE * 0.1
+        return frames * gain + offset + channel + rng.standard_normal(frames.shape) * CONTENT_SCALE * 0.3
+
+    speakers = []
+    for _ in range(count):
+        offset = rng.standard_normal(COEFFS) * CONTENT_SCALE * 0.5
+        gain = 1 + rng.standard_normal(COEFFS) * 0.15
+        sentence = rng.integers(0, PHONES, 22)
+        speakers.append([clip(offset, gain, sentence) for _ in range(2 + PROBES)])
+    return speakers
+
+
+def recorded_speakers(root):
+    """Raw MFCC clips per speaker directory, extracted like AuthHandler.extract_mfcc."""
+    import librosa
+    import soundfile as sf
+
+    speakers = []
+    for name in sorted(os.listdir(root)):
+        folder = os.path.join(root, name)
+        if not os.path.isdir(folder):
+            continue
+        clips = []
+        for file in sorted(os.listdir(folder)):
+            if not file.lower().endswith('.wav'):
+                continue
+            y, sr = sf.read(os.path.join(folder, file))
+            if y.ndim > 1:
+                y = y.mean(axis=1)
+            if sr != 22050:
+                y = librosa.resample(y, orig_sr=sr, target_sr=22050)
+            clips.append(librosa.feature.mfcc(y=y, sr=22050, n_mfcc=COEFFS).T)
+        if len(clips) >= 3:
+            speakers.append(clips)
+    return speakers
+
+
+def score_pairs(speakers, verifier):
+    genuine, impostor = [], []
+    rng = np.random.default_rng(1)
+    for i, clips in enumerate(speakers):
+        template, stats = enroll(clips[0], clips[1])
+        for probe in clips[2:]:
+            genuine.append(verifier.scores(template, apply_cmvn(probe, stats)))
+        others = [j for j in range(len(speakers)) if j != i]
+        for j in rng.choice(others, min(PROBES, len(others)), replace=False):
+            other = speakers[j]
+            impostor.append(verifier.scores(template, apply_cmvn(other[rng.integers(len(other))], stats)))
+    return genuine, impostor
+
+
+def stage_timings(speakers, verifier, repeat=5):
+    template, stats = enroll(speakers[0][0], speakers[0][1])
+    probe = apply_cmvn(speakers[0][2], stats)
+    timings = {}
+    for stage in cascade.STAGES:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            verifier._score(stage, template, probe)
+        timings[stage] = (time.perf_counter() - start) / repeat
+    return timings
+
+
+def main():
+    args = sys.argv[1:]
+    if args and os.path.isdir(args[0]):
+        speakers = recorded_speakers(args[0])
+        source = args[0]
+    else:
+        speakers = synthetic_speakers(int(args[0]) if args else 40)
+        source = "synthetic"
+    if len(speakers) < 2:
+        print("Need at least two speakers with three clips each.")
+        return
+    verifier = cascade.VerificationCascade()
+    genuine, impostor = score_pairs(speakers, verifier)
+    timings = stage_timings(speakers, verifier)
+    print(f"{source}: {len(speakers)} speakers, {len(genuine)} genuine and {len(impostor)} impostor pairs")
+    full = verifier.thresholds["full"]
+    for stage in cascade.STAGES:
+        threshold = verifier.thresholds[stage]
+        if stage in ("lower_bound", "banded"):
+            threshold = max(threshold, full * cascade.BANDED_HEADROOM)
+        g = np.array([s[stage] for s in genuine])
+        m = np.array([s[stage] for s in impostor])
+        print(f"{stage:>11}: genuine p50 {np.median(g):8.2f} p99 {np.percentile(g, 99):8.2f} max {g.max():8.2f}"
+              f" | impostor min {m.min():8.2f} p50 {np.median(m):8.2f}"
+              f" | threshold {threshold:7.2f} rejects {np.mean(g >= threshold):6.1%} genuine, {np.mean(m >= threshold):6.1%} impostor"
+              f" | {timings[stage] * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Micro-benchmark for phrase matching.
+
+Times every matching mode over a batch of generated phrase pairs, and compares
+the cached stored-phrase path used by verify_phrase against normalizing the
+stored phrase on every attempt.
+
+    python bench_phrase_match.py [pairs]
+"""
+import sys
+import random
+import timeit
+import phrase_match
+
+REPEAT = 5
+
+WORDS = ["open", "my", "phone", "unlock", "the", "door", "hello", "again", "this", "is", "me",
+         "blue", "river", "seven", "42", "garden", "morning", "coffee", "please", "now"]
+
+
+def make_pairs(count, seed=7):
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        stored = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 6)))
+        spoken = stored.split()
+        # Simulate recognizer noise: drop, swap or misspell a word now and then
+        if rng.random() < 0.3:
+            spoken.pop(rng.randrange(len(spoken)))
+        if rng.random() < 0.3 and len(spoken) > 1:
+            i = rng.randrange(len(spoken) - 1)
+            spoken[i], spoken[i + 1] = spoken[i + 1], spoken[i]
+        if rng.random() < 0.3:
+            i = rng.randrange(len(spoken))
+            spoken[i] = spoken[i][:-1] + "e"
+        pairs.append((" ".join(spoken).capitalize() + ".", stored))
+    return pairs
+
+
+def best_of(func):
+    return min(timeit.repeat(func, number=1, repeat=REPEAT))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    pairs = make_pairs(count)
+    print(f"backend: {phrase_match.BACKEND}, pairs: {count}")
+
+    for mode in phrase_match.MODES:
+        elapsed = best_of(lambda: [phrase_match.similarity(a, b, mode) for a, b in pairs])
+        print(f"{mode:>9}: {elapsed * 1e6 / count:8.2f} us/pair (normalizing both sides)")
+
+    matcher = phrase_match.PhraseMatcher()
+    forms = [matcher.stored_form(f"user{i}", stored.encode(), lambda s=stored: s) for i, (_, stored) in enumerate(pairs)]
+    elapsed = best_of(lambda: [matcher.score(a, f) for (a, _), f in zip(pairs, forms)])
+    print(f"   cached: {elapsed * 1e6 / count:8.2f} us/pair (stored phrase pre-normalized)")
+
+    try:
+        from cryptography.fernet import Fernet
+    except ImportError:
+        print("cryptography not installed; skipping decrypt comparison")
+        return
+    cipher = Fernet(Fernet.generate_key())
+    blobs = [cipher.encrypt(stored.encode()) for _, stored in pairs]
+    elapsed = best_of(lambda: [phrase_match.similarity(a, cipher.decrypt(blob).decode(), "ratio")
+                               for (a, _), blob in zip(pairs, blobs)])
+    print(f"  decrypt: {elapsed * 1e6 / count:8.2f} us/pair (decrypt + normalize every attempt)")
+    warm = phrase_match.PhraseMatcher()
+    for i, blob in enumerate(blobs):
+        warm.stored_form(f"user{i}", blob, lambda b=blob: cipher.decrypt(b).decode())
+    elapsed = best_of(lambda: [matcher.score(a, warm.stored_form(f"user{i}", blob, None))
+                               for i, ((a, _), blob) in enumerate(zip(pairs, blobs))])
+    print(f"cache hit: {elapsed * 1e6 / count:8.2f} us/pair (lookup + score)")
+
+
+if __name__ == "__main__":
+    main()
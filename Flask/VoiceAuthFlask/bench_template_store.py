@@ -0,0 +1,128 @@
+"""Measure storage and memory savings of quantized voice templates.
+
+Builds synthetic enrollments and reports, per storage format, the SQLite file
+size and bytes per user, then the RSS growth of loading every voice from the
+database (old WAV blobs decoded as sf.read does, or int8 templates dequantized
+to float32 as the app does) versus scoring through a memory-mapped template bank.
+
+    python bench_template_store.py [users]
+"""
+import io
+import os
+import sys
+import wave
+import sqlite3
+import resource
+import tempfile
+import subprocess
+import numpy as np
+import template_store
+from normalization import serialize_cmvn_stats
+
+FRAMES = 216  # ~5 s at 22.05 kHz with librosa's default 512-sample hop
+COEFFS = 13
+HOP = 512
+
+
+def wav_blob(frames):
+    """Size-equivalent of the 16-bit WAV that save_average_voice used to store."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(22050)
+        w.writeframes(bytes(2 * frames * HOP))
+    return buffer.getvalue()
+
+
+def make_features(users, seed=7):
+    rng = np.random.default_rng(seed)
+    return [rng.standard_normal((FRAMES + rng.integers(-40, 40), COEFFS)).astype(np.float32) for _ in range(users)]
+
+
+def write_db(path, blobs):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (email TEXT PRIMARY KEY, template_data BLOB)")
+    conn.executemany("INSERT INTO users VALUES (?, ?)", ((f"user{i}@example.com", b) for i, b in enumerate(blobs)))
+    conn.commit()
+    conn.close()
+    return os.path.getsize(path)
+
+
+def rss_kb():
+    """Current resident set size; peak RSS is inherited across exec on Linux, so it cannot be used here."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def rss_child(mode, path):
+    """Run in a subprocess so each measurement starts from a clean heap."""
+    base = rss_kb()
+    probe = make_features(1, seed=99)[0]
+    if mode == "wav":
+        # The WAV path decodes every sample to float64 before MFCC extraction even starts
+        conn = sqlite3.connect(path)
+        candidates = []
+        for (b,) in conn.execute("SELECT template_data FROM users"):
+            with wave.open(io.BytesIO(b)) as w:
+                samples = np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16)
+            candidates.append(samples / 32768.0)
+        conn.close()
+    elif mode == "db":
+        conn = sqlite3.connect(path)
+        templates = [template_store.dequantize_template(b) for (b,) in conn.execute("SELECT template_data FROM users")]
+        conn.close()
+        means = np.array([t.mean(axis=0) for t in templates])
+        nearest = np.argsort(np.linalg.norm(means - probe.mean(axis=0), axis=1))[:10]
+        candidates = [templates[i] for i in nearest]
+    else:
+        bank = template_store.TemplateBank(path)
+        candidates = [bank.template(email) for email, _ in bank.nearest(probe, top_k=10)]
+    print(rss_kb() - base)
+    return candidates
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--rss":
+        rss_child(sys.argv[2], sys.argv[3])
+        return
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    features = make_features(users)
+    with tempfile.TemporaryDirectory() as tmp:
+        formats = {
+            "wav": [wav_blob(len(f)) for f in features],
+            "float32": [f.tobytes() for f in features],
+            "float16": [template_store.quantize_template(f, "float16") for f in features],
+            "int8": [template_store.quantize_template(f, "int8") for f in features],
+        }
+        print(f"{users} users, ~{FRAMES} frames x {COEFFS} coefficients")
+        wav_size = None
+        for name, blobs in formats.items():
+            size = write_db(os.path.join(tmp, f"{name}.db"), blobs)
+            wav_size = wav_size or size
+            print(f"{name:>8}: {size / 1e6:8.2f} MB  {size / users / 1024:7.1f} KB/user  {wav_size / size:6.1f}x smaller than wav")
+
+        wav_db = os.path.join(tmp, "wav.db")
+        int8_db = os.path.join(tmp, "int8.db")
+        bank_path = os.path.join(tmp, "templates.bank")
+        # Synthetic features are already unit-variance, so every user gets identity statistics
+        identity = serialize_cmvn_stats((np.zeros(COEFFS), np.ones(COEFFS)))
+        template_store.build_template_bank(bank_path, ((f"user{i}@example.com", b, identity)
+                                                       for i, b in enumerate(formats["int8"])))
+        print(f"    bank: {os.path.getsize(bank_path) / 1e6:8.2f} MB")
+        labels = {"wav": "decode all WAVs from DB (float64 audio)", "db": "load all int8 templates from DB (float32)",
+                  "bank": "memory-mapped bank"}
+        for mode, path in (("wav", wav_db), ("db", int8_db), ("bank", bank_path)):
+            out = subprocess.run([sys.executable, __file__, "--rss", mode, path], capture_output=True, text=True, check=True)
+            label = labels[mode]
+            print(f"RSS growth, {label}: {int(out.stdout.strip()) / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
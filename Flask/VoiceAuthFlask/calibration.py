@@ -0,0 +1,156 @@
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+import numpy as np
+from cascade import DTW_THRESHOLD
+from database import DEFAULT_TENANT, get_score_history, save_score_history
+
+HISTORY_SIZE = 32
+MIN_SAMPLES = 5
+# Rings kept in memory (two per active user); older ones are reloaded from the shard
+CACHE_SIZE = 10000
+
+# Voice: per-frame DTW distance, lower is better; accept while distance < threshold.
+# The ceiling stays below the impostor scores seen by bench_cascade.py.
+VOICE_DEFAULT = DTW_THRESHOLD
+VOICE_FLOOR = DTW_THRESHOLD * 0.8
+VOICE_CEILING = DTW_THRESHOLD * 1.2
+VOICE_MIN_SPREAD = DTW_THRESHOLD * 0.05
+# Phrase: similarity in percent, higher is better; accept while similarity > threshold
+PHRASE_DEFAULT = 90.0
+PHRASE_FLOOR = 80.0
+PHRASE_CEILING = 95.0
+PHRASE_MIN_SPREAD = 2.0
+# Margin in (robust) standard deviations around the user's genuine scores
+SPREAD = 2.5
+# Scales the median absolute deviation to a standard deviation for normal data
+MAD_SCALE = 1.4826
+
+
+def robust_spread(scores, minimum):
+    """Median and MAD-based standard deviation of scores, never below minimum.
+
+    ASR similarity is often a flat 100, which gives a zero deviation; the minimum
+    keeps a perfectly consistent user from getting a zero-width margin.
+    """
+    median = float(np.median(scores))
+    deviation = MAD_SCALE * float(np.median(np.abs(scores - median)))
+    return median, max(deviation, minimum)
+
+
+class ScoreRing:
+    """Fixed-size ring buffer of float32 scores (HISTORY_SIZE * 4 bytes per user and kind)."""
+
+    __slots__ = ('scores', 'pos', 'count')
+
+    def __init__(self, capacity=HISTORY_SIZE):
+        self.scores = array('f', bytes(4 * capacity))
+        self.pos = 0
+        self.count = 0
+
+    def add(self, score):
+        self.scores[self.pos] = score
+        self.pos = (self.pos + 1) % len(self.scores)
+        self.count = min(self.count + 1, len(self.scores))
+
+    def values(self):
+        """Scores in chronological order."""
+        if self.count < len(self.scores):
+            return np.frombuffer(self.scores, dtype=np.float32, count=self.count).copy()
+        return np.roll(np.frombuffer(self.scores, dtype=np.float32), -self.pos)
+
+    def to_bytes(self):
+        return self.values().tobytes()
+
+    @classmethod
+    def from_bytes(cls, data, capacity=HISTORY_SIZE):
+        ring = cls(capacity)
+        if data:
+            for score in np.frombuffer(data, dtype=np.float32)[-capacity:]:
+                ring.add(float(score))
+        return ring
+
+
+class ScoreHistory:
+    """Per-user genuine score history, persisted in the user's shard with an LRU cache in memory."""
+
+    def __init__(self, tenant=DEFAULT_TENANT, capacity=HISTORY_SIZE, cache_size=CACHE_SIZE):
+        self.tenant = tenant
+        self.capacity = capacity
+        self.cache_size = cache_size
+        self._rings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached_ring(self, email, kind):
+        # Caller holds self._lock
+        key = (email, kind)
+        if key in self._rings:
+            self._rings.move_to_end(key)
+            return self._rings[key]
+        ring = ScoreRing.from_bytes(get_score_history(email, kind, self.tenant), self.capacity)
+        self._rings[key] = ring
+        if len(self._rings) > self.cache_size:
+            self._rings.popitem(last=False)
+        return ring
+
+    def ring(self, email, kind):
+        with self._lock:
+            return self._cached_ring(email, kind)
+
+    def record(self, email, kind, scores):
+        """Append genuine scores for a user and persist the ring."""
+        if not email or not scores:
+            return
+        with self._lock:
+            ring = self._cached_ring(email, kind)
+            for score in scores:
+                ring.add(float(score))
+            data = ring.to_bytes()
+        try:
+            save_score_history(email, kind, data, self.tenant)
+        except Exception as e:
+            logging.error(f"Failed to persist {kind} score history for {email}: {e}")
+
+    def reset(self, email):
+        """Forget a user's history, e.g. after re-enrollment."""
+        with self._lock:
+            for kind in ("voice", "phrase"):
+                self._rings.pop((email, kind), None)
+                try:
+                    save_score_history(email, kind, b"", self.tenant)
+                except Exception as e:
+                    logging.error(f"Failed to reset {kind} score history for {email}: {e}")
+
+
+class ThresholdCalibrator:
+    """Derives per-user accept thresholds from the genuine-score distribution.
+
+    With fewer than MIN_SAMPLES genuine scores the global default applies. After
+    that the threshold sits SPREAD robust standard deviations beyond the user's
+    median, clamped so that it can never drift far from the global operating
+    point. It only ever loosens the default for users whose genuine scores need
+    it; tightening for consistent users must be enabled with allow_tighter.
+    """
+
+    def __init__(self, history, spread=SPREAD, min_samples=MIN_SAMPLES, allow_tighter=False):
+        self.history = history
+        self.spread = spread
+        self.min_samples = min_samples
+        self.allow_tighter = allow_tighter
+
+    def voice_threshold(self, email):
+        scores = self.history.ring(email, "voice").values() if email else ()
+        if len(scores) < self.min_samples:
+            return VOICE_DEFAULT
+        median, deviation = robust_spread(scores, VOICE_MIN_SPREAD)
+        floor = VOICE_FLOOR if self.allow_tighter else VOICE_DEFAULT
+        return min(max(median + self.spread * deviation, floor), VOICE_CEILING)
+
+    def phrase_threshold(self, email):
+        scores = self.history.ring(email, "phrase").values() if email else ()
+        if len(scores) < self.min_samples:
+            return PHRASE_DEFAULT
+        median, deviation = robust_spread(scores, PHRASE_MIN_SPREAD)
+        ceiling = PHRASE_CEILING if self.allow_tighter else PHRASE_DEFAULT
+        return min(max(median - self.spread * deviation, PHRASE_FLOOR), ceiling)
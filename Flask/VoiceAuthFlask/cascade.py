@@ -0,0 +1,167 @@
+import threading
+import numpy as np
+from fastdtw import fastdtw
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+from scipy.spatial.distance import cdist, euclidean
+
+# Final DTW cutoff used by match_voice (distance must stay below this). DTW-based
+# scores are divided by the frame count of both clips. Provisional: on the
+# synthetic CMVN set of bench_cascade.py genuine pairs reach ~1.5 and impostors
+# start at ~2.3; it has not been measured on real recordings yet.
+DTW_THRESHOLD = 1.9
+
+# Early stages only reject; anything they let through is scored by the next stage.
+# The banded DTW only approximates the fastdtw distance, so it gets headroom.
+# The lower bound never exceeds the banded distance, so it shares that cutoff and
+# only rejects pairs the banded stage would reject anyway.
+# GLOBAL_THRESHOLD and BANDED_HEADROOM come from bench_cascade.py; re-run it on
+# real recordings (python bench_cascade.py <dir>) to tune them for a deployment.
+GLOBAL_THRESHOLD = 5.0
+BANDED_HEADROOM = 1.2
+BANDED_THRESHOLD = DTW_THRESHOLD * BANDED_HEADROOM
+LOWER_BOUND_THRESHOLD = BANDED_THRESHOLD
+BAND_RATIO = 0.1
+
+STAGES = ("global", "lower_bound", "banded", "full")
+
+
+def global_distance(feats_a, feats_b):
+    """Distance between MFCC mean vectors and covariance matrices of two clips."""
+    mean_a = np.mean(feats_a, axis=0)
+    mean_b = np.mean(feats_b, axis=0)
+    if len(feats_a) > 1 and len(feats_b) > 1:
+        cov_a = np.cov(feats_a, rowvar=False)
+        cov_b = np.cov(feats_b, rowvar=False)
+        cov_dist = np.linalg.norm(cov_a - cov_b)
+    else:
+        cov_dist = 0.0
+    return float(np.linalg.norm(mean_a - mean_b) + cov_dist)
+
+
+def band_width(n, m, band_ratio=BAND_RATIO):
+    """Half-width of the Sakoe-Chiba band used for clips of n and m frames."""
+    return max(int(max(n, m) * band_ratio), abs(n - m) + 1)
+
+
+def dtw_lower_bound(feats_a, feats_b, band_ratio=BAND_RATIO, cutoff=np.inf):
+    """Lower bound on banded_dtw with the same Sakoe-Chiba band (LB_Kim + LB_Keogh).
+
+    A banded path pairs the first and the last frames, and visits every frame of
+    feats_a at least once, matched to a frame of feats_b inside that row's band.
+    So the summed distance of each frame to the envelope (per-coefficient min/max)
+    of its band never exceeds the banded DTW distance. If that bound stays below
+    cutoff it is tightened to the distance to the nearest frame in each band,
+    which is still a lower bound but costs a full pass over the band.
+    """
+    n, m = len(feats_a), len(feats_b)
+    ends = np.linalg.norm(feats_a[0] - feats_b[0])
+    if n > 1 and m > 1:
+        ends += np.linalg.norm(feats_a[-1] - feats_b[-1])
+    if ends >= cutoff:
+        return float(ends)
+    band = band_width(n, m, band_ratio)
+    # Row i of banded_dtw spans columns centre - band .. centre + band (1-based)
+    centres = np.arange(1, n + 1) * m // n
+    # Running min/max clipped at the clip edges; row centre 0 reuses the window of
+    # column 1, which is one column wider and so still a valid (looser) envelope.
+    rows = np.maximum(centres - 1, 0)
+    width = 2 * band + 1
+    lower = minimum_filter1d(feats_b, width, axis=0)[rows]
+    upper = maximum_filter1d(feats_b, width, axis=0)[rows]
+    excess = np.maximum(feats_a - upper, 0) + np.maximum(lower - feats_a, 0)
+    bound = max(ends, np.sum(np.linalg.norm(excess, axis=1)))
+    if bound >= cutoff:
+        return float(bound)
+    cols = centres[:, None] + np.arange(-band - 1, band)
+    local = cdist(feats_a, feats_b)[np.arange(n)[:, None], np.clip(cols, 0, m - 1)]
+    nearest = np.where((cols >= 0) & (cols < m), local, np.inf).min(axis=1)
+    return float(max(bound, np.sum(nearest)))
+
+
+def banded_dtw(feats_a, feats_b, band_ratio=BAND_RATIO):
+    """DTW restricted to a Sakoe-Chiba band around the diagonal."""
+    n, m = len(feats_a), len(feats_b)
+    band = band_width(n, m, band_ratio)
+    cost = np.full((n + 1, m + 1), np.inf)
+    cost[0, 0] = 0.0
+    for i in range(1, n + 1):
+        centre = i * m // n
+        lo = max(1, centre - band)
+        hi = min(m, centre + band)
+        if lo > hi:
+            continue
+        local = np.linalg.norm(feats_b[lo - 1:hi] - feats_a[i - 1], axis=1)
+        prev = cost[i - 1]
+        row = cost[i]
+        for k, j in enumerate(range(lo, hi + 1)):
+            row[j] = local[k] + min(prev[j], prev[j - 1], row[j - 1])
+    return float(cost[n, m])
+
+
+class VerificationCascade:
+    """Multi-stage voice verifier that rejects obvious impostors cheaply."""
+
+    def __init__(self, global_threshold=GLOBAL_THRESHOLD, lower_bound_threshold=LOWER_BOUND_THRESHOLD,
+                 banded_threshold=BANDED_THRESHOLD, dtw_threshold=DTW_THRESHOLD, band_ratio=BAND_RATIO):
+        self.thresholds = {
+            "global": global_threshold,
+            "lower_bound": lower_bound_threshold,
+            "banded": banded_threshold,
+            "full": dtw_threshold,
+        }
+        self.band_ratio = band_ratio
+        self.counters = {stage: {"passed": 0, "rejected": 0} for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def _count(self, stage, passed):
+        with self._lock:
+            self.counters[stage]["passed" if passed else "rejected"] += 1
+
+    def stats(self):
+        """Return a snapshot of per-stage pass/reject counters."""
+        with self._lock:
+            return {stage: dict(counts) for stage, counts in self.counters.items()}
+
+    def _score(self, stage, auth_features, test_features, cutoff=np.inf):
+        if stage == "global":
+            return global_distance(auth_features, test_features)
+        # Warping costs grow with clip length, so they are scored per frame of both clips
+        frames = len(auth_features) + len(test_features)
+        if stage == "lower_bound":
+            return dtw_lower_bound(auth_features, test_features, self.band_ratio, cutoff * frames) / frames
+        if stage == "banded":
+            return banded_dtw(auth_features, test_features, self.band_ratio) / frames
+        distance, _ = fastdtw(auth_features, test_features, dist=euclidean)
+        return float(distance) / frames
+
+    def scores(self, auth_features, test_features):
+        """Score of every stage without early exit, for tuning thresholds."""
+        return {stage: self._score(stage, auth_features, test_features) for stage in STAGES}
+
+    def verify(self, auth_features, test_features, dtw_threshold=None):
+        """Run the cascade and return (accepted, score, stage that decided).
+
+        A per-user dtw_threshold above the default loosens every early stage with
+        it, the global check by the same factor, so a user calibrated for a
+        looser match is not still rejected by a fixed early cutoff.
+        """
+        full_threshold = self.thresholds["full"] if dtw_threshold is None else dtw_threshold
+        loosen = max(full_threshold / self.thresholds["full"], 1.0) if self.thresholds["full"] else 1.0
+        for stage in STAGES[:-1]:
+            threshold = self.thresholds[stage]
+            if threshold is None:
+                continue
+            if stage == "global":
+                threshold *= loosen
+            else:
+                threshold = max(threshold, full_threshold * BANDED_HEADROOM)
+            score = self._score(stage, auth_features, test_features, threshold)
+            if score >= threshold:
+                self._count(stage, False)
+                return False, score, stage
+            self._count(stage, True)
+
+        distance = self._score("full", auth_features, test_features)
+        accepted = bool(distance < full_threshold)
+        self._count("full", accepted)
+        return accepted, distance, "full"
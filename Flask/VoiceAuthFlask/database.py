@@ -1,64 +1,254 @@
 import sqlite3
 import os
+import re
+import hashlib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+# Legacy single-file store, still used when sharding is off for the default tenant
 DB_NAME = 'users.db'
+SHARD_DIR = os.getenv('VOICEAUTH_SHARD_DIR', 'shards')
+SHARD_COUNT = max(1, int(os.getenv('VOICEAUTH_SHARD_COUNT', '1')))
+DEFAULT_TENANT = os.getenv('VOICEAUTH_TENANT', 'default')
 
-# Setup logging
-logging.basicConfig(filename="auth.log", level=logging.INFO, format='%(asctime)s:%(levelname)s:%(message)s')
+_schema_ready = set()
+_schema_lock = threading.Lock()
 
-def init_db():
-    """Initialize SQLite database."""
+def _tenant_dir(tenant):
+    """Filesystem-safe directory for a tenant's shards."""
+    safe = re.sub(r'[^A-Za-z0-9_.-]', '_', tenant or DEFAULT_TENANT)
+    # "." and ".." would resolve to the shard directory or its parent
+    if not safe.strip('.'):
+        safe = '_' * len(safe)
+    return os.path.join(SHARD_DIR, safe)
+
+def shard_index(email, tenant=DEFAULT_TENANT, shard_count=SHARD_COUNT):
+    """Stable shard number for an email within a tenant."""
+    digest = hashlib.blake2b(f"{tenant}:{email}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shard_count
+
+def shard_paths(tenant=DEFAULT_TENANT):
+    """All shard files for a tenant, in shard order."""
+    if SHARD_COUNT == 1 and tenant == DEFAULT_TENANT:
+        return [DB_NAME]
+    return [os.path.join(_tenant_dir(tenant), f'users_{i:03d}.db') for i in range(SHARD_COUNT)]
+
+def shard_path(email, tenant=DEFAULT_TENANT):
+    """Shard file that holds the given user."""
+    return shard_paths(tenant)[shard_index(email, tenant)]
+
+def _create_schema(conn):
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            email TEXT PRIMARY KEY,
+            voice_data BLOB,
+            phrase_data BLOB,
+            key_data BLOB,
+            cmvn_data BLOB,
+            template_data BLOB
+        )
+    ''')
+    # Older databases predate per-user CMVN statistics and quantized templates
+    columns = [row[1] for row in c.execute('PRAGMA table_info(users)')]
+    for column in ('cmvn_data', 'template_data'):
+        if column not in columns:
+            c.execute(f'ALTER TABLE users ADD COLUMN {column} BLOB')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS score_history (
+            email TEXT,
+            kind TEXT,
+            scores BLOB,
+            PRIMARY KEY (email, kind)
+        )
+    ''')
+    conn.commit()
+
+def _connect(path):
+    """Open a shard, creating its directory and schema on first use."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA synchronous=NORMAL')
+    if path not in _schema_ready:
+        with _schema_lock:
+            if path not in _schema_ready:
+                # WAL lets readers proceed while another thread writes to the same shard;
+                # the mode is stored in the file, so it only needs setting once.
+                conn.execute('PRAGMA journal_mode=WAL')
+                _create_schema(conn)
+                _schema_ready.add(path)
+    return conn
+
+def init_db(tenant=DEFAULT_TENANT):
+    """Initialize every SQLite shard for a tenant."""
+    for path in shard_paths(tenant):
+        conn = None
+        try:
+            conn = _connect(path)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to initialize DB shard {path}: {e}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+    logging.info(f"Database initialized successfully ({SHARD_COUNT} shard(s) for tenant {tenant}).")
+
+def save_user_data(email, voice_data, phrase_data, key_data, cmvn_data=None, tenant=DEFAULT_TENANT,
+                   template_data=None):
+    """Save or update user data in the user's shard."""
+    conn = None
     try:
-        os.makedirs(os.path.dirname(DB_NAME), exist_ok=True) if os.path.dirname(DB_NAME) else None
-        conn = sqlite3.connect(DB_NAME)
+        conn = _connect(shard_path(email, tenant))
         c = conn.cursor()
         c.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                email TEXT PRIMARY KEY,
-                voice_data BLOB,
-                phrase_data BLOB,
-                key_data BLOB
-            )
-        ''')
+            INSERT OR REPLACE INTO users (email, voice_data, phrase_data, key_data, cmvn_data, template_data)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (email, voice_data, phrase_data, key_data, cmvn_data, template_data))
         conn.commit()
-        logging.info("Database initialized successfully.")
+        logging.info(f"User data saved for {email}.")
     except sqlite3.Error as e:
-        logging.error(f"Failed to initialize DB: {e}")
+        logging.error(f"Failed to save data for {email}: {e}")
         raise
     finally:
         if conn:
             conn.close()
 
-def save_user_data(email, voice_data, phrase_data, key_data):
-    """Save or update user data in the database."""
+def get_user_data(email, tenant=DEFAULT_TENANT):
+    """Retrieve (voice, phrase, key, cmvn, template) data by email in one query."""
+    conn = None
     try:
-        conn = sqlite3.connect(DB_NAME)
+        conn = _connect(shard_path(email, tenant))
         c = conn.cursor()
-        c.execute('''
-            INSERT OR REPLACE INTO users (email, voice_data, phrase_data, key_data)
-            VALUES (?, ?, ?, ?)
-        ''', (email, voice_data, phrase_data, key_data))
+        c.execute('SELECT voice_data, phrase_data, key_data, cmvn_data, template_data FROM users WHERE email = ?',
+                  (email,))
+        result = c.fetchone()
+        return result  # May be None if user not found
+    except sqlite3.Error as e:
+        logging.error(f"Failed to fetch data for {email}: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def save_score_history(email, kind, scores, tenant=DEFAULT_TENANT):
+    """Store a user's packed score history ('voice' or 'phrase')."""
+    conn = None
+    try:
+        conn = _connect(shard_path(email, tenant))
+        conn.execute('INSERT OR REPLACE INTO score_history (email, kind, scores) VALUES (?, ?, ?)',
+                     (email, kind, scores))
         conn.commit()
-        logging.info(f"User data saved for {email}.")
     except sqlite3.Error as e:
-        logging.error(f"Failed to save data for {email}: {e}")
+        logging.error(f"Failed to save {kind} score history for {email}: {e}")
         raise
     finally:
         if conn:
             conn.close()
 
-def get_user_data(email):
-    """Retrieve user data by email."""
+def get_score_history(email, kind, tenant=DEFAULT_TENANT):
+    """Retrieve a user's packed score history, or None."""
+    conn = None
     try:
-        conn = sqlite3.connect(DB_NAME)
+        conn = _connect(shard_path(email, tenant))
         c = conn.cursor()
-        c.execute('SELECT voice_data, phrase_data, key_data FROM users WHERE email = ?', (email,))
+        c.execute('SELECT scores FROM score_history WHERE email = ? AND kind = ?', (email, kind))
         result = c.fetchone()
-        return result  # May be None if user not found
+        return result[0] if result else None
     except sqlite3.Error as e:
-        logging.error(f"Failed to fetch data for {email}: {e}")
+        logging.error(f"Failed to fetch {kind} score history for {email}: {e}")
         return None
     finally:
         if conn:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+def scan_shards(func, tenant=DEFAULT_TENANT, max_workers=None):
+    """Run func(conn) on every shard of a tenant in parallel and return the results.
+
+    Each shard gets its own connection; a failing shard is logged and yields None.
+    """
+    def run(path):
+        conn = None
+        try:
+            conn = _connect(path)
+            return func(conn)
+        except sqlite3.Error as e:
+            logging.error(f"Shard scan failed on {path}: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    paths = shard_paths(tenant)
+    with ThreadPoolExecutor(max_workers=max_workers or len(paths)) as pool:
+        return list(pool.map(run, paths))
+
+def count_users(tenant=DEFAULT_TENANT):
+    """Total number of enrolled users across a tenant's shards."""
+    counts = scan_shards(lambda conn: conn.execute('SELECT COUNT(*) FROM users').fetchone()[0], tenant)
+    return sum(count for count in counts if count)
+
+def all_user_templates(tenant=DEFAULT_TENANT):
+    """(email, packed template, CMVN stats) for every user of a tenant with a template, across all shards."""
+    rows = scan_shards(lambda conn: conn.execute(
+        'SELECT email, template_data, cmvn_data FROM users WHERE template_data IS NOT NULL').fetchall(), tenant)
+    return [row for shard_rows in rows if shard_rows for row in shard_rows]
+
+def vacuum_shards(tenant=DEFAULT_TENANT):
+    """Checkpoint the WAL and reclaim free pages on every shard."""
+    def vacuum(conn):
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.execute('VACUUM')
+        return True
+    return scan_shards(vacuum, tenant)
+
+def _copy_to_shards(cursor, insert, tenant, batch_size):
+    """Insert the rows of cursor (email first) into each email's shard; return the row count."""
+    moved = 0
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return moved
+        by_shard = {}
+        for row in rows:
+            by_shard.setdefault(shard_path(row[0], tenant), []).append(row)
+        for path, shard_rows in by_shard.items():
+            shard = _connect(path)
+            try:
+                shard.executemany(insert, shard_rows)
+                shard.commit()
+            finally:
+                shard.close()
+        moved += len(rows)
+
+def migrate_legacy_db(tenant=DEFAULT_TENANT, batch_size=500):
+    """Copy users and their score history from the single legacy users.db into the tenant's shards."""
+    if shard_paths(tenant) == [DB_NAME] or not os.path.exists(DB_NAME):
+        return 0
+    conn = None
+    try:
+        conn = sqlite3.connect(DB_NAME)
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(users)')]
+        optional = [name if name in columns else 'NULL' for name in ('cmvn_data', 'template_data')]
+        cursor = conn.execute(f'SELECT email, voice_data, phrase_data, key_data, {", ".join(optional)} FROM users')
+        moved = _copy_to_shards(cursor, '''
+            INSERT OR REPLACE INTO users (email, voice_data, phrase_data, key_data, cmvn_data, template_data)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', tenant, batch_size)
+        # Calibration history lives next to the users it belongs to; older databases lack it
+        histories = 0
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'score_history'").fetchone():
+            cursor = conn.execute('SELECT email, kind, scores FROM score_history')
+            histories = _copy_to_shards(cursor, '''
+                INSERT OR REPLACE INTO score_history (email, kind, scores) VALUES (?, ?, ?)
+            ''', tenant, batch_size)
+        logging.info(f"Migrated {moved} users and {histories} score histories from {DB_NAME} "
+                     f"into {SHARD_COUNT} shards.")
+        return moved
+    except sqlite3.Error as e:
+        logging.error(f"Failed to migrate legacy DB: {e}")
+        raise
+    finally:
+        if conn:
+            conn.close()
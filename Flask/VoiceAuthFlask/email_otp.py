@@ -4,9 +4,6 @@ from email.message import EmailMessage
 import os
 import logging
 
-# Setup logging
-logging.basicConfig(filename="auth.log", level=logging.INFO, format='%(asctime)s:%(levelname)s:%(message)s')
-
 def send_otp(to_email):
     """Send OTP to the specified email."""
     try:
@@ -0,0 +1,130 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import cv2
+
+EVIDENCE_DIR = os.path.join("static", "intruders")
+THUMBNAIL_SIZE = (200, 150)
+RING_SIZE = 8
+FRAME_INTERVAL = 0.1
+# Auto-exposure needs a few frames before images are usable
+WARMUP_FRAMES = 10
+IDLE_RELEASE = 60.0
+
+
+class IntruderCamera:
+    """Keeps a webcam open and a ring buffer of recent frames.
+
+    A background thread reads frames while the camera is warm, so a capture is
+    just a copy of the newest buffered frame. The camera is released after it
+    has not been requested for IDLE_RELEASE seconds, or as soon as release() is
+    called. Callers warm it only once an attempt has failed, so genuine users
+    who get in on the first try never have the camera opened.
+    """
+
+    def __init__(self, device=0, ring_size=RING_SIZE, frame_interval=FRAME_INTERVAL, idle_release=IDLE_RELEASE):
+        self.device = device
+        self.frames = deque(maxlen=ring_size)
+        self.frame_interval = frame_interval
+        self.idle_release = idle_release
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_used = 0.0
+        self._frames_read = 0
+        self.available = True
+
+    def warm(self):
+        """Open the camera in the background if it is not already running."""
+        with self._lock:
+            self._last_used = time.monotonic()
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._reader, name="intruder-camera", daemon=True)
+            self._thread.start()
+
+    def release(self):
+        """Let the reader close the camera now instead of after IDLE_RELEASE."""
+        with self._lock:
+            self._last_used = float("-inf")
+
+    def _reader(self):
+        cam = cv2.VideoCapture(self.device)
+        if not cam.isOpened():
+            self.available = False
+            logging.error("Camera not available.")
+            return
+        self.available = True
+        self._frames_read = 0
+        try:
+            while time.monotonic() - self._last_used < self.idle_release:
+                ret, frame = cam.read()
+                if ret:
+                    self._frames_read += 1
+                    if self._frames_read > WARMUP_FRAMES:
+                        self.frames.append((time.time(), frame))
+                time.sleep(self.frame_interval)
+        finally:
+            cam.release()
+            self.frames.clear()
+
+    def latest(self, timeout=0.0):
+        """Newest (timestamp, frame) from the ring buffer, waiting up to timeout for one."""
+        self.warm()
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.frames:
+                timestamp, frame = self.frames[-1]
+                return timestamp, frame.copy()
+            if not self.available or time.monotonic() >= deadline:
+                return None
+            time.sleep(self.frame_interval)
+
+
+class IntruderEvidence:
+    """Stores timestamped, per-email intruder captures without blocking the caller."""
+
+    def __init__(self, camera=None, evidence_dir=EVIDENCE_DIR, wait_for_frame=3.0):
+        self.camera = camera or IntruderCamera()
+        self.evidence_dir = evidence_dir
+        self.wait_for_frame = wait_for_frame
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="intruder-evidence")
+
+    def _email_dir(self, email):
+        safe = re.sub(r'[^A-Za-z0-9_.@-]', '_', email or "unknown")
+        # "." and ".." would resolve to the evidence directory or its parent
+        if not safe.strip('.'):
+            safe = '_' * len(safe)
+        return os.path.join(self.evidence_dir, safe)
+
+    def capture(self, email=None, on_saved=None):
+        """Queue a capture; on_saved(path, thumbnail_rgb) is called from the worker when done.
+
+        Returns a Future resolving to the saved path, or None if no frame was available.
+        """
+        return self._executor.submit(self._capture, email, on_saved)
+
+    def _capture(self, email, on_saved):
+        latest = self.camera.latest(timeout=self.wait_for_frame)
+        if latest is None:
+            logging.error(f"Intruder capture failed for {email}: no camera frame.")
+            return None
+        timestamp, frame = latest
+        ok, encoded = cv2.imencode(".jpg", frame)
+        if not ok:
+            logging.error(f"Intruder capture failed for {email}: JPEG encoding error.")
+            return None
+        directory = self._email_dir(email)
+        os.makedirs(directory, exist_ok=True)
+        name = datetime.fromtimestamp(timestamp).strftime("%Y%m%d-%H%M%S-%f") + ".jpg"
+        path = os.path.join(directory, name)
+        with open(path, "wb") as f:
+            f.write(encoded.tobytes())
+        if on_saved:
+            thumbnail = cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+            on_saved(path, cv2.cvtColor(thumbnail, cv2.COLOR_BGR2RGB))
+        return path
@@ -0,0 +1,86 @@
+import io
+import numpy as np
+
+# Floor for the per-coefficient std. A coefficient that is near-constant over the
+# enrollment clips (silence, clipped input) would otherwise scale every later
+# probe by orders of magnitude and reject it. MFCCs are in dB-like units whose
+# std over real speech is well above this, so normal statistics are untouched.
+MIN_STD = 1.0
+
+
+def compute_cmvn_stats(features):
+    """Return per-coefficient (mean, std) of a frames x coefficients array."""
+    features = np.asarray(features, dtype=np.float64)
+    return features.mean(axis=0), features.std(axis=0)
+
+
+def apply_cmvn(features, stats=None):
+    """Cepstral mean/variance normalization.
+
+    With no stats the clip is normalized against itself; otherwise the given
+    (mean, std) pair is used, e.g. the per-user statistics saved at signup.
+    """
+    if stats is None:
+        stats = compute_cmvn_stats(features)
+    mean, std = stats
+    return (features - mean) / np.maximum(std, MIN_STD)
+
+
+def serialize_cmvn_stats(stats):
+    """Pack (mean, std) into bytes for the users table."""
+    buffer = io.BytesIO()
+    np.save(buffer, np.vstack(stats).astype(np.float32), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def deserialize_cmvn_stats(data):
+    """Unpack bytes written by serialize_cmvn_stats, or None if missing/corrupt."""
+    if not data:
+        return None
+    try:
+        packed = np.load(io.BytesIO(data), allow_pickle=False).astype(np.float64)
+        return packed[0], packed[1]
+    except (ValueError, IndexError, OSError):
+        return None
+
+
+class RunningCMVN:
+    """Streaming mean/variance estimate (Welford) for chunked feature extraction."""
+
+    def __init__(self, n_coeffs=13):
+        self.count = 0
+        self.mean = np.zeros(n_coeffs)
+        self._m2 = np.zeros(n_coeffs)
+
+    def update(self, frames):
+        """Fold a chunk of frames into the running statistics."""
+        frames = np.atleast_2d(np.asarray(frames, dtype=np.float64))
+        n = len(frames)
+        if n == 0:
+            return
+        chunk_mean = frames.mean(axis=0)
+        chunk_m2 = ((frames - chunk_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self._m2 = self._m2 + chunk_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    def stats(self):
+        """Current (mean, std) estimate."""
+        if self.count == 0:
+            return self.mean.copy(), np.ones_like(self.mean)
+        return self.mean.copy(), np.sqrt(self._m2 / self.count)
+
+    def normalize(self, frames, update=True):
+        """Normalize a chunk with the statistics seen so far (including it if update)."""
+        if update:
+            self.update(frames)
+        return apply_cmvn(frames, self.stats())
+
+
+def normalize_stream(chunks, running=None):
+    """Yield CMVN-normalized chunks from an iterable of MFCC frame chunks."""
+    running = running or RunningCMVN()
+    for chunk in chunks:
+        yield running.normalize(chunk)
@@ -0,0 +1,129 @@
+import re
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Prefer a C edit-distance implementation; fuzzywuzzy without python-Levenshtein
+# and difflib are pure Python and much slower.
+try:
+    from rapidfuzz.fuzz import ratio as _ratio
+    BACKEND = "rapidfuzz"
+except ImportError:
+    try:
+        from Levenshtein import ratio as _lev_ratio
+
+        def _ratio(a, b):
+            return _lev_ratio(a, b) * 100
+        BACKEND = "Levenshtein"
+    except ImportError:
+        try:
+            from fuzzywuzzy.fuzz import ratio as _ratio
+            BACKEND = "fuzzywuzzy"
+        except ImportError:
+            from difflib import SequenceMatcher
+
+            def _ratio(a, b):
+                return SequenceMatcher(None, a, b).ratio() * 100
+            BACKEND = "difflib"
+
+MODES = ("ratio", "token", "phonetic")
+CACHE_SIZE = 10000
+
+_ONES = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+         "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen"]
+_TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+_SCALES = [(1000000000, "billion"), (1000000, "million"), (1000, "thousand"), (100, "hundred")]
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_DIGITS = re.compile(r"\d+")
+_SOUNDEX = str.maketrans("bfpvcgjkqsxzdtlmnr", "111122222222334556")
+
+
+def number_to_words(n):
+    """Spell out a non-negative integer ("21" -> "twenty one")."""
+    if n < 20:
+        return _ONES[n]
+    if n < 100:
+        return _TENS[n // 10] + ("" if n % 10 == 0 else " " + _ONES[n % 10])
+    for value, name in _SCALES:
+        if n >= value:
+            head = number_to_words(n // value) + " " + name
+            return head if n % value == 0 else head + " " + number_to_words(n % value)
+    return str(n)
+
+
+def normalize_phrase(text):
+    """Canonical form for comparison: lowercase, no accents or punctuation, numbers as words."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = _PUNCTUATION.sub(" ", text)
+    text = _DIGITS.sub(lambda m: " " + number_to_words(int(m.group())) + " ", text)
+    return " ".join(text.split())
+
+
+def soundex(word):
+    """Four-character Soundex code of a word."""
+    if not word:
+        return ""
+    first = word[0].upper()
+    digits = word.lower().translate(_SOUNDEX)
+    code = []
+    previous = digits[0]
+    for ch, digit in zip(word.lower()[1:], digits[1:]):
+        if digit.isdigit() and digit != previous:
+            code.append(digit)
+        if ch not in "hw":
+            previous = digit
+    return (first + "".join(code) + "000")[:4]
+
+
+def phrase_form(normalized, mode):
+    """Comparison string of an already-normalized phrase for the given mode."""
+    if mode == "token":
+        return " ".join(sorted(normalized.split()))
+    if mode == "phonetic":
+        return " ".join(soundex(word) for word in normalized.split())
+    return normalized
+
+
+def similarity(spoken, stored, mode="ratio"):
+    """Similarity (0-100) of two raw phrases."""
+    return _ratio(phrase_form(normalize_phrase(spoken), mode), phrase_form(normalize_phrase(stored), mode))
+
+
+class PhraseMatcher:
+    """Matches spoken phrases against per-user stored phrases.
+
+    The decrypted, normalized form of each stored phrase is cached (LRU) under
+    the email and a hash of the encrypted blob, so a re-enrolled phrase is never
+    served stale and repeat attempts skip decryption and normalization.
+    """
+
+    def __init__(self, mode="ratio", cache_size=CACHE_SIZE):
+        if mode not in MODES:
+            raise ValueError(f"Unknown phrase matching mode: {mode}")
+        self.mode = mode
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stored_form(self, email, phrase_data, decrypt):
+        """Cached comparison form of a user's phrase; decrypt() is only called on a miss."""
+        key = (email, hashlib.sha256(phrase_data).digest())
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        phrase = decrypt()
+        if phrase is None:
+            return None
+        form = phrase_form(normalize_phrase(phrase), self.mode)
+        with self._lock:
+            self._cache[key] = form
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return form
+
+    def score(self, spoken, stored_form):
+        """Similarity (0-100) of a raw spoken phrase against a cached stored form."""
+        return _ratio(phrase_form(normalize_phrase(spoken), self.mode), stored_form)
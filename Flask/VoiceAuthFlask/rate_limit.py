@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import socket
+import getpass
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+# Token bucket: BURST attempts at once, refilled at RATE attempts per second
+RATE = 1 / 20
+BURST = 5
+# Sliding window of failures that triggers a lockout
+MAX_FAILURES = 6
+FAILURE_WINDOW = 15 * 60
+# Lockouts double with every repeat offence, up to MAX_LOCKOUT
+BASE_LOCKOUT = 60
+MAX_LOCKOUT = 60 * 60
+IDLE_EXPIRY = 60 * 60
+# A source (one machine or client) is shared by everyone who uses it, so it only
+# gets a larger bucket and never locks out; lockouts apply to emails alone.
+SOURCE_RATE = 1 / 2
+SOURCE_BURST = 30
+SWEEP_EVERY = 256
+
+RATE_LIMIT_DB = os.getenv('VOICEAUTH_RATE_LIMIT_DB')
+SOURCE = os.getenv('VOICEAUTH_SOURCE')
+
+
+class LimitState:
+    """Per-key limiter state; kept small because one exists per email and source."""
+
+    __slots__ = ('tokens', 'updated', 'failures', 'locked_until', 'strikes')
+
+    def __init__(self, tokens, updated, failures=None, locked_until=0.0, strikes=0):
+        self.tokens = tokens
+        self.updated = updated
+        self.failures = failures or []
+        self.locked_until = locked_until
+        self.strikes = strikes
+
+
+class SQLiteLimitStore:
+    """Optional backend that shares limiter state between worker processes."""
+
+    def __init__(self, path):
+        self.path = path
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL,
+                    updated REAL,
+                    failures TEXT,
+                    locked_until REAL,
+                    strikes INTEGER
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Connection holding the write lock, so read-modify-write is atomic across processes."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            yield conn
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def load(conn, key):
+        row = conn.execute('SELECT tokens, updated, failures, locked_until, strikes FROM rate_limits WHERE key = ?',
+                           (key,)).fetchone()
+        if row is None:
+            return None
+        tokens, updated, failures, locked_until, strikes = row
+        return LimitState(tokens, updated, json.loads(failures), locked_until, strikes)
+
+    @staticmethod
+    def save(conn, key, state):
+        conn.execute('INSERT OR REPLACE INTO rate_limits VALUES (?, ?, ?, ?, ?, ?)',
+                     (key, state.tokens, state.updated, json.dumps(state.failures), state.locked_until, state.strikes))
+
+    def sweep(self, before):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute('DELETE FROM rate_limits WHERE updated < ? AND locked_until < ?', (before, before))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class RateLimiter:
+    """Token-bucket limiter with sliding-window failure counting and progressive lockout.
+
+    Keys are arbitrary strings, e.g. "email:alice@example.com" or "source:kiosk-1".
+    check() consumes one token per key and must pass for every key; failures and
+    successes are reported afterwards so that repeated failures lock the key out.
+    With max_failures=None the limiter only throttles and never locks a key out.
+    """
+
+    def __init__(self, rate=RATE, burst=BURST, max_failures=MAX_FAILURES, failure_window=FAILURE_WINDOW,
+                 base_lockout=BASE_LOCKOUT, max_lockout=MAX_LOCKOUT, idle_expiry=IDLE_EXPIRY, store=None,
+                 clock=time.time):
+        self.rate = rate
+        self.burst = burst
+        self.max_failures = max_failures
+        self.failure_window = failure_window
+        self.base_lockout = base_lockout
+        self.max_lockout = max_lockout
+        self.idle_expiry = idle_expiry
+        self.store = store
+        self.clock = clock
+        self._states = {}
+        self._lock = threading.Lock()
+        self._ops = 0
+
+    @contextmanager
+    def _locked_states(self, keys, now):
+        with self._lock:
+            self._ops += 1
+            if self._ops % SWEEP_EVERY == 0:
+                self._sweep(now)
+            if self.store is None:
+                states = [self._states.setdefault(key, LimitState(self.burst, now)) for key in keys]
+                yield states
+                return
+            with self.store.transaction() as conn:
+                states = [self.store.load(conn, key) or LimitState(self.burst, now) for key in keys]
+                yield states
+                for key, state in zip(keys, states):
+                    self.store.save(conn, key, state)
+
+    def _refill(self, state, now):
+        state.tokens = min(self.burst, state.tokens + (now - state.updated) * self.rate)
+        state.updated = now
+
+    def check(self, *keys):
+        """Consume an attempt for every key; return (allowed, seconds until retry)."""
+        now = self.clock()
+        with self._locked_states(keys, now) as states:
+            retry_after = 0.0
+            for state in states:
+                self._refill(state, now)
+                if state.locked_until > now:
+                    retry_after = max(retry_after, state.locked_until - now)
+                elif state.tokens < 1:
+                    retry_after = max(retry_after, (1 - state.tokens) / self.rate)
+            if retry_after > 0:
+                return False, retry_after
+            for state in states:
+                state.tokens -= 1
+            return True, 0.0
+
+    def record_failure(self, *keys):
+        """Count a failed verification; locks a key out once it fails too often."""
+        if self.max_failures is None:
+            return
+        now = self.clock()
+        with self._locked_states(keys, now) as states:
+            for state in states:
+                state.failures = [t for t in state.failures if now - t < self.failure_window]
+                state.failures.append(now)
+                if len(state.failures) >= self.max_failures:
+                    state.strikes += 1
+                    lockout = min(self.base_lockout * 2 ** (state.strikes - 1), self.max_lockout)
+                    state.locked_until = now + lockout
+                    state.failures = []
+                    logging.warning(f"Rate limiter locked out a key for {lockout:.0f}s (strike {state.strikes}).")
+
+    def record_success(self, *keys):
+        """Clear failure history and backoff after a successful verification."""
+        now = self.clock()
+        with self._locked_states(keys, now) as states:
+            for state in states:
+                state.failures = []
+                state.strikes = 0
+
+    def _sweep(self, now):
+        before = now - self.idle_expiry
+        if self.store is not None:
+            self.store.sweep(before)
+            return
+        expired = [key for key, state in self._states.items()
+                   if state.updated < before and state.locked_until < now]
+        for key in expired:
+            del self._states[key]
+
+
+def default_limiter():
+    """Per-email limiter for the app; persisted in SQLite when VOICEAUTH_RATE_LIMIT_DB is set."""
+    store = SQLiteLimitStore(RATE_LIMIT_DB) if RATE_LIMIT_DB else None
+    return RateLimiter(store=store)
+
+
+def default_source_limiter():
+    """Per-source throttle for the app: a larger bucket and no lockout."""
+    store = SQLiteLimitStore(RATE_LIMIT_DB) if RATE_LIMIT_DB else None
+    return RateLimiter(rate=SOURCE_RATE, burst=SOURCE_BURST, max_failures=None, store=store)
+
+
+def default_source():
+    """Identity of the client this process serves: VOICEAUTH_SOURCE, else OS user and host."""
+    if SOURCE:
+        return SOURCE
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "unknown"
+    return f"{user}@{socket.gethostname()}"
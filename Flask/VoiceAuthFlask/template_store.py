@@ -0,0 +1,199 @@
+import json
+import struct
+import logging
+import numpy as np
+from database import DEFAULT_TENANT, all_user_templates
+from normalization import MIN_STD, apply_cmvn, deserialize_cmvn_stats
+
+# Packed template: magic, dtype code, frames, coefficients, then for int8 a float32
+# scale per coefficient, then the frames x coefficients payload.
+MAGIC = b"VAT1"
+_HEADER = struct.Struct("<4sBIH")
+DTYPES = {"int8": (1, np.int8), "float16": (2, np.float16)}
+_CODES = {code: (name, dtype) for name, (code, dtype) in DTYPES.items()}
+DEFAULT_DTYPE = "int8"
+
+BANK_MAGIC = b"VATBANK2"
+_BANK_HEADER = struct.Struct("<8sQ")
+
+
+def quantize_template(features, dtype=DEFAULT_DTYPE):
+    """Pack a frames x coefficients feature array as int8 (per-coefficient scale) or float16."""
+    features = np.asarray(features, dtype=np.float32)
+    frames, coeffs = features.shape
+    code = DTYPES[dtype][0]
+    header = _HEADER.pack(MAGIC, code, frames, coeffs)
+    if dtype == "float16":
+        return header + features.astype(np.float16).tobytes()
+    scale = np.max(np.abs(features), axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    quantized = np.clip(np.rint(features / scale), -127, 127).astype(np.int8)
+    return header + scale.astype(np.float32).tobytes() + quantized.tobytes()
+
+
+def _unpack(data):
+    magic, code, frames, coeffs = _HEADER.unpack_from(data)
+    if magic != MAGIC or code not in _CODES:
+        raise ValueError("Not a packed voice template")
+    name, np_dtype = _CODES[code]
+    offset = _HEADER.size
+    scale = None
+    if name == "int8":
+        scale = np.frombuffer(data, dtype=np.float32, count=coeffs, offset=offset)
+        offset += 4 * coeffs
+    values = np.frombuffer(data, dtype=np_dtype, count=frames * coeffs, offset=offset).reshape(frames, coeffs)
+    return values, scale
+
+
+def dequantize_template(data):
+    """Unpack a template written by quantize_template into float32 features, or None."""
+    if not data:
+        return None
+    try:
+        values, scale = _unpack(data)
+    except (ValueError, struct.error):
+        return None
+    if scale is None:
+        return values.astype(np.float32)
+    return values * scale
+
+
+def build_template_bank(path, templates):
+    """Write (email, packed template, serialized CMVN stats) rows into one memory-mappable int8 bank file.
+
+    Each template is normalized with its own user's statistics, so those are
+    stored alongside it; templates enrolled with per-clip normalization get NaN
+    statistics. Layout: magic, index length, JSON index, then float32
+    scales, template means, CMVN means and CMVN stds (templates x coefficients)
+    and the concatenated int8 frames.
+    """
+    emails, frames, scales, means, cmvn_means, cmvn_stds, payload = [], [], [], [], [], [], []
+    coeffs = None
+    for email, data, cmvn_data in templates:
+        features = dequantize_template(data)
+        stats = deserialize_cmvn_stats(cmvn_data)
+        if features is None:
+            logging.warning(f"Skipping {email} in template bank: missing or corrupt template.")
+            continue
+        if coeffs is None:
+            coeffs = features.shape[1]
+        elif features.shape[1] != coeffs:
+            raise ValueError(f"Template for {email} has {features.shape[1]} coefficients, expected {coeffs}")
+        if stats is None:
+            stats = np.full(coeffs, np.nan), np.full(coeffs, np.nan)
+        values, scale = _unpack(quantize_template(features, "int8"))
+        emails.append(email)
+        frames.append(len(values))
+        scales.append(scale)
+        means.append(features.mean(axis=0))
+        cmvn_means.append(stats[0])
+        cmvn_stds.append(stats[1])
+        payload.append(values)
+
+    offsets = np.concatenate(([0], np.cumsum(frames))).tolist() if frames else [0]
+    index = json.dumps({"emails": emails, "offsets": offsets, "coeffs": coeffs or 0}).encode()
+    # Pad so the float32 arrays that follow start 16-byte aligned
+    index += b" " * (-(_BANK_HEADER.size + len(index)) % 16)
+    with open(path, "wb") as f:
+        f.write(_BANK_HEADER.pack(BANK_MAGIC, len(index)))
+        f.write(index)
+        if emails:
+            f.write(np.asarray(scales, dtype=np.float32).tobytes())
+            for array in (means, cmvn_means, cmvn_stds):
+                f.write(np.asarray(array, dtype=np.float32).tobytes())
+            for values in payload:
+                f.write(values.tobytes())
+    return len(emails)
+
+
+def export_template_bank(path, tenant=DEFAULT_TENANT):
+    """Build a bank file from every stored template of a tenant."""
+    return build_template_bank(path, all_user_templates(tenant))
+
+
+class TemplateBank:
+    """Read-only, memory-mapped view of a template bank file.
+
+    Only the JSON index is read eagerly; scales, means and frames stay on disk and
+    are paged in by the OS as scoring touches them. Probes are raw MFCC frames
+    (AuthHandler.extract_mfcc) and are normalized with each candidate's own CMVN
+    statistics, the same way match_voice normalizes a login probe.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, index_len = _BANK_HEADER.unpack(f.read(_BANK_HEADER.size))
+            if magic != BANK_MAGIC:
+                raise ValueError(f"{path} is not a template bank")
+            index = json.loads(f.read(index_len))
+        self.emails = index["emails"]
+        self.offsets = index["offsets"]
+        self.coeffs = index["coeffs"]
+        self._rows = {email: i for i, email in enumerate(self.emails)}
+        count = len(self.emails)
+        start = _BANK_HEADER.size + index_len
+        if count == 0:
+            self.scales = self.means = self.cmvn_means = self.cmvn_stds = self.frames = None
+            return
+        shape = (count, self.coeffs)
+        self.scales = np.memmap(path, dtype=np.float32, mode="r", offset=start, shape=shape)
+        start += self.scales.nbytes
+        self.means = np.memmap(path, dtype=np.float32, mode="r", offset=start, shape=shape)
+        start += self.means.nbytes
+        self.cmvn_means = np.memmap(path, dtype=np.float32, mode="r", offset=start, shape=shape)
+        start += self.cmvn_means.nbytes
+        self.cmvn_stds = np.memmap(path, dtype=np.float32, mode="r", offset=start, shape=shape)
+        start += self.cmvn_stds.nbytes
+        self.frames = np.memmap(path, dtype=np.int8, mode="r", offset=start, shape=(self.offsets[-1], self.coeffs))
+
+    def __len__(self):
+        return len(self.emails)
+
+    def __contains__(self, email):
+        return email in self._rows
+
+    def quantized(self, email):
+        """(int8 frames view, scale) for a user; no copy is made."""
+        row = self._rows[email]
+        return self.frames[self.offsets[row]:self.offsets[row + 1]], self.scales[row]
+
+    def template(self, email):
+        """Float32 features for a user."""
+        values, scale = self.quantized(email)
+        return values * scale
+
+    def cmvn_stats(self, email):
+        """(mean, std) the user's template was normalized with, or None if per clip."""
+        row = self._rows[email]
+        if np.isnan(self.cmvn_means[row]).any():
+            return None
+        return self.cmvn_means[row], self.cmvn_stds[row]
+
+    def nearest(self, probe, top_k=10):
+        """Emails whose template mean is closest to the raw probe's mean, best first.
+
+        The probe mean is normalized with every row's statistics in one vectorized
+        pass over the mapped arrays, as a cheap pre-filter before DTW in
+        identification workloads.
+        """
+        if not len(self):
+            return []
+        probe_means = (np.mean(probe, axis=0) - self.cmvn_means) / np.maximum(self.cmvn_stds, MIN_STD)
+        # A per-clip normalized probe has zero mean; those rows carry NaN statistics
+        probe_means = np.nan_to_num(probe_means, nan=0.0)
+        distances = np.linalg.norm(self.means - probe_means, axis=1)
+        order = np.argsort(distances)[:top_k]
+        return [(self.emails[i], float(distances[i])) for i in order]
+
+    def identify(self, probe, cascade, top_k=10):
+        """Score a raw probe against the top_k nearest templates with a VerificationCascade.
+
+        Returns the best accepted (email, distance), or None.
+        """
+        best = None
+        for email, _ in self.nearest(probe, top_k):
+            normalized = apply_cmvn(probe, self.cmvn_stats(email))
+            accepted, distance, _ = cascade.verify(self.template(email), normalized)
+            if accepted and (best is None or distance < best[1]):
+                best = (email, distance)
+        return best
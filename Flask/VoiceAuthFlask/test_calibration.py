@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+import calibration
+from calibration import (ScoreHistory, ScoreRing, ThresholdCalibrator, robust_spread, PHRASE_CEILING,
+                         PHRASE_DEFAULT, PHRASE_FLOOR, VOICE_CEILING, VOICE_DEFAULT, VOICE_FLOOR)
+
+
+class FakeHistory:
+    def __init__(self, **scores):
+        self.scores = scores
+
+    def ring(self, email, kind):
+        ring = ScoreRing()
+        for score in self.scores.get(kind, ()):
+            ring.add(score)
+        return ring
+
+
+@pytest.fixture
+def shard(monkeypatch):
+    """In-memory stand-in for the score_history table, counting reads."""
+    stored, reads = {}, []
+
+    def get(email, kind, tenant):
+        reads.append((email, kind))
+        return stored.get((email, kind))
+
+    def save(email, kind, data, tenant):
+        stored[(email, kind)] = data
+
+    monkeypatch.setattr(calibration, "get_score_history", get)
+    monkeypatch.setattr(calibration, "save_score_history", save)
+    return stored, reads
+
+
+def test_robust_spread_ignores_outliers():
+    median, deviation = robust_spread(np.array([1.0, 1.1, 0.9, 1.0, 50.0]), 0.0)
+    assert median == pytest.approx(1.0)
+    assert deviation == pytest.approx(1.4826 * 0.1)
+
+
+def test_robust_spread_minimum():
+    assert robust_spread(np.full(8, 100.0), 2.0) == (100.0, 2.0)
+
+
+def test_ring_keeps_latest_in_order():
+    ring = ScoreRing(capacity=3)
+    for score in range(5):
+        ring.add(score)
+    assert ring.values().tolist() == [2, 3, 4]
+    assert ScoreRing.from_bytes(ring.to_bytes(), capacity=2).values().tolist() == [3, 4]
+
+
+def test_defaults_until_enough_samples():
+    calibrator = ThresholdCalibrator(FakeHistory(voice=[3.0] * 4, phrase=[50.0] * 4))
+    assert calibrator.voice_threshold("a@example.com") == VOICE_DEFAULT
+    assert calibrator.phrase_threshold("a@example.com") == PHRASE_DEFAULT
+
+
+def test_loosens_within_ceiling_and_floor():
+    calibrator = ThresholdCalibrator(FakeHistory(voice=[VOICE_DEFAULT * 1.05] * 8, phrase=[85.0] * 8))
+    assert VOICE_DEFAULT < calibrator.voice_threshold("a@example.com") <= VOICE_CEILING
+    assert PHRASE_FLOOR <= calibrator.phrase_threshold("a@example.com") < PHRASE_DEFAULT
+    calibrator = ThresholdCalibrator(FakeHistory(voice=[VOICE_DEFAULT * 3] * 8, phrase=[10.0] * 8))
+    assert calibrator.voice_threshold("a@example.com") == VOICE_CEILING
+    assert calibrator.phrase_threshold("a@example.com") == PHRASE_FLOOR
+
+
+def test_never_tightens_by_default():
+    history = FakeHistory(voice=[VOICE_DEFAULT * 0.2] * 8, phrase=[100.0] * 8)
+    calibrator = ThresholdCalibrator(history)
+    assert calibrator.voice_threshold("a@example.com") == VOICE_DEFAULT
+    assert calibrator.phrase_threshold("a@example.com") == PHRASE_DEFAULT
+    tighter = ThresholdCalibrator(history, allow_tighter=True)
+    assert VOICE_FLOOR <= tighter.voice_threshold("a@example.com") < VOICE_DEFAULT
+    assert PHRASE_DEFAULT < tighter.phrase_threshold("a@example.com") <= PHRASE_CEILING
+
+
+def test_history_persists_and_resets(shard):
+    stored, _ = shard
+    history = ScoreHistory(capacity=4)
+    history.record("a@example.com", "voice", [1.0, 1.5])
+    assert np.frombuffer(stored[("a@example.com", "voice")], dtype=np.float32).tolist() == [1.0, 1.5]
+    assert ScoreHistory(capacity=4).ring("a@example.com", "voice").values().tolist() == [1.0, 1.5]
+    history.reset("a@example.com")
+    assert history.ring("a@example.com", "voice").values().tolist() == []
+
+
+def test_history_cache_is_bounded(shard):
+    _, reads = shard
+    history = ScoreHistory(cache_size=2)
+    for email in ("a", "b", "c"):
+        history.ring(email, "voice")
+    assert len(history._rings) == 2
+    history.ring("c", "voice")
+    assert len(reads) == 3
+    # "a" was evicted first and is reloaded from the shard
+    history.ring("a", "voice")
+    assert len(reads) == 4
+    assert ("b", "voice") not in history._rings
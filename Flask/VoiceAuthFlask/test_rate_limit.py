@@ -0,0 +1,113 @@
+import pytest
+from rate_limit import RateLimiter, SQLiteLimitStore
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_burst_then_refill(clock):
+    limiter = RateLimiter(rate=1 / 10, burst=3, clock=clock)
+    assert [limiter.check("email:a")[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = limiter.check("email:a")
+    assert not allowed
+    assert retry_after == pytest.approx(10)
+    clock.now += 10
+    assert limiter.check("email:a") == (True, 0.0)
+    assert not limiter.check("email:a")[0]
+
+
+def test_refill_is_capped_at_burst(clock):
+    limiter = RateLimiter(rate=1, burst=2, clock=clock)
+    clock.now += 3600
+    assert [limiter.check("k")[0] for _ in range(3)] == [True, True, False]
+
+
+def test_every_key_must_pass(clock):
+    limiter = RateLimiter(rate=1 / 10, burst=1, clock=clock)
+    assert limiter.check("source:kiosk", "email:a")[0]
+    # The source bucket is empty, so a fresh email is refused too and keeps its token
+    assert not limiter.check("source:kiosk", "email:b")[0]
+    assert limiter.check("email:b")[0]
+
+
+def test_lockout_doubles_and_is_capped(clock):
+    limiter = RateLimiter(rate=100, burst=100, max_failures=2, base_lockout=60, max_lockout=200, clock=clock)
+    lockouts = []
+    for _ in range(4):
+        limiter.record_failure("email:a")
+        limiter.record_failure("email:a")
+        allowed, retry_after = limiter.check("email:a")
+        assert not allowed
+        lockouts.append(retry_after)
+        clock.now += retry_after
+    assert lockouts == [pytest.approx(60), pytest.approx(120), pytest.approx(200), pytest.approx(200)]
+
+
+def test_failures_outside_window_do_not_count(clock):
+    limiter = RateLimiter(rate=100, burst=100, max_failures=2, failure_window=60, clock=clock)
+    limiter.record_failure("email:a")
+    clock.now += 61
+    limiter.record_failure("email:a")
+    assert limiter.check("email:a")[0]
+
+
+def test_success_resets_backoff(clock):
+    limiter = RateLimiter(rate=100, burst=100, max_failures=1, base_lockout=60, clock=clock)
+    limiter.record_failure("email:a")
+    clock.now += 60
+    limiter.record_success("email:a")
+    limiter.record_failure("email:a")
+    assert limiter.check("email:a")[1] == pytest.approx(60)
+
+
+def test_no_lockout_without_max_failures(clock):
+    limiter = RateLimiter(rate=100, burst=100, max_failures=None, clock=clock)
+    for _ in range(50):
+        limiter.record_failure("source:kiosk")
+    assert limiter.check("source:kiosk")[0]
+
+
+def test_idle_keys_are_swept(clock, monkeypatch):
+    monkeypatch.setattr("rate_limit.SWEEP_EVERY", 2)
+    limiter = RateLimiter(idle_expiry=60, clock=clock)
+    limiter.check("email:a")
+    clock.now += 61
+    limiter.check("email:b")
+    assert list(limiter._states) == ["email:b"]
+
+
+def test_sqlite_store_shares_state(clock, tmp_path):
+    path = str(tmp_path / "limits.db")
+    first = RateLimiter(rate=1 / 10, burst=2, max_failures=2, store=SQLiteLimitStore(path), clock=clock)
+    second = RateLimiter(rate=1 / 10, burst=2, max_failures=2, store=SQLiteLimitStore(path), clock=clock)
+    assert first.check("email:a")[0]
+    assert second.check("email:a")[0]
+    assert not first.check("email:a")[0]
+    first.record_failure("email:b")
+    second.record_failure("email:b")
+    clock.now += 30
+    allowed, retry_after = second.check("email:b")
+    assert not allowed
+    assert retry_after == pytest.approx(30)
+
+
+def test_sqlite_store_sweep_keeps_locked_keys(clock, tmp_path):
+    store = SQLiteLimitStore(str(tmp_path / "limits.db"))
+    limiter = RateLimiter(max_failures=1, base_lockout=3600, idle_expiry=60, store=store, clock=clock)
+    limiter.check("email:idle")
+    limiter.record_failure("email:locked")
+    clock.now += 61
+    store.sweep(clock.now - 60)
+    with store.transaction() as conn:
+        assert store.load(conn, "email:idle") is None
+        assert store.load(conn, "email:locked").locked_until > clock.now
@@ -3,8 +3,7 @@ from ttkbootstrap.constants import *
 from ttkbootstrap.scrolled import ScrolledText
 from ttkbootstrap.tooltip import ToolTip
 from tkinter import messagebox, StringVar, Toplevel
-import threading
-import time
+from ui_bridge import UIBridge
 
 class VoiceAuthUI:
     def __init__(self, root, auth_handler=None, theme="darkly"):
@@ -15,6 +14,10 @@ class VoiceAuthUI:
         self.root.geometry("450x350")
         self.root.resizable(False, False)
         self.running = False
+        # Auth workers reach Tk only through this bridge
+        self.bridge = UIBridge(self.root)
+        if self.auth_handler is not None:
+            self.auth_handler.ui = self.bridge
 
         # Configure custom radio button style
         self.style.configure("Custom.TRadiobutton", font=("Arial", 12), foreground="#ffffff", background="#212529")
@@ -256,8 +259,8 @@ class VoiceAuthUI:
             return
         self.running = True
         start_button.config(state='disabled')
-        threading.Thread(target=self.auth_handler.run_signup, args=(email, status_text, progress_bar, window, self.image_label), daemon=True).start()
-        threading.Thread(target=self._enable_button_after, args=(start_button,), daemon=True).start()
+        self.bridge.run_worker(self.auth_handler.run_signup, (email, status_text, progress_bar, window, self.image_label),
+                               on_complete=lambda result: self._on_process_complete(start_button))
 
     def start_login(self, email, status_text, progress_bar, window, start_button):
         """Initiate login process."""
@@ -272,8 +275,8 @@ class VoiceAuthUI:
             return
         self.running = True
         start_button.config(state='disabled')
-        threading.Thread(target=self.auth_handler.run_login, args=(email, status_text, progress_bar, window, self.image_label), daemon=True).start()
-        threading.Thread(target=self._enable_button_after, args=(start_button,), daemon=True).start()
+        self.bridge.run_worker(self.auth_handler.run_login, (email, status_text, progress_bar, window, self.image_label),
+                               on_complete=lambda result: self._on_process_complete(start_button))
 
     def start_reset(self, email, status_text, progress_bar, window, reset_button):
         """Initiate reset process."""
@@ -288,16 +291,11 @@ class VoiceAuthUI:
             return
         self.running = True
         reset_button.config(state='disabled')
-        threading.Thread(target=self.auth_handler.run_password_reset, args=(email, status_text, progress_bar, window, self.image_label), daemon=True).start()
-        threading.Thread(target=self._enable_button_after, args=(reset_button,), daemon=True).start()
-
-    def _enable_button_after(self, button):
-        """Re-enable the start button after the process completes."""
-        while self.running:
-            time.sleep(0.1)
-        try:
-            if button.winfo_exists():
-                button.config(state='normal')
-        except Exception:
-            pass
-        self.running = False
\ No newline at end of file
+        self.bridge.run_worker(self.auth_handler.run_password_reset, (email, status_text, progress_bar, window, self.image_label),
+                               on_complete=lambda result: self._on_process_complete(reset_button))
+
+    def _on_process_complete(self, button):
+        """Re-enable the start button once the worker finishes; runs on the Tk main loop."""
+        self.running = False
+        if button.winfo_exists():
+            button.config(state='normal')
\ No newline at end of file
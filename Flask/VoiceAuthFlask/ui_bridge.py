@@ -0,0 +1,137 @@
+import queue
+import logging
+import threading
+from datetime import datetime
+from tkinter import messagebox
+
+POLL_INTERVAL_MS = 50
+MAX_EVENTS_PER_TICK = 200
+
+
+class UIBridge:
+    """Event queue between auth worker threads and the Tk main loop.
+
+    Workers never touch Tk widgets; they publish callables here and the main
+    loop runs them from an after() poll. call() blocks the worker until the main
+    loop has produced a result, which is how dialogs are shown from a worker.
+    """
+
+    def __init__(self, root, poll_interval=POLL_INTERVAL_MS):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.events = queue.SimpleQueue()
+        self._main_thread = threading.get_ident()
+        self.root.after(self.poll_interval, self._drain)
+
+    def _in_main_thread(self):
+        return threading.get_ident() == self._main_thread
+
+    def _drain(self):
+        """Run pending events on the Tk main loop.
+
+        The next poll is scheduled first: a messagebox run by an event spins a
+        nested event loop, and posts such as a finished intruder photo must keep
+        draining while it is open.
+        """
+        self.root.after(self.poll_interval, self._drain)
+        for _ in range(MAX_EVENTS_PER_TICK):
+            try:
+                func, args, kwargs, reply = self.events.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                result = func(*args, **kwargs)
+                if reply is not None:
+                    reply.put((True, result))
+            except Exception as e:
+                logging.error(f"UI event {getattr(func, '__name__', func)} failed: {e}")
+                if reply is not None:
+                    reply.put((False, e))
+
+    def post(self, func, *args, **kwargs):
+        """Schedule func on the main loop without waiting for it."""
+        if self._in_main_thread():
+            func(*args, **kwargs)
+        else:
+            self.events.put((func, args, kwargs, None))
+
+    def call(self, func, *args, **kwargs):
+        """Run func on the main loop and return its result to the calling worker."""
+        if self._in_main_thread():
+            return func(*args, **kwargs)
+        reply = queue.SimpleQueue()
+        self.events.put((func, args, kwargs, reply))
+        ok, result = reply.get()
+        if not ok:
+            raise result
+        return result
+
+    def run_worker(self, target, args=(), on_complete=None):
+        """Run target in a daemon thread and deliver its result to on_complete on the main loop."""
+        def worker():
+            result = None
+            try:
+                result = target(*args)
+            except Exception as e:
+                logging.error(f"Worker {getattr(target, '__name__', target)} failed: {e}")
+            finally:
+                if on_complete:
+                    self.post(on_complete, result)
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        return thread
+
+    # Widget helpers; each one runs on the main loop.
+
+    def status(self, status_text, message):
+        """Append a timestamped line to a ScrolledText status area."""
+        line = f"{datetime.now().strftime('%H:%M:%S')}: {message}\n"
+        self.post(self._append_status, status_text, line)
+
+    def progress(self, progress_bar, value):
+        """Show the progress bar and set its value."""
+        self.post(self._set_progress, progress_bar, value)
+
+    def hide_progress(self, progress_bar):
+        self.post(self._hide_progress, progress_bar)
+
+    def message(self, kind, title, text, parent=None):
+        """Show a messagebox (showerror, showinfo, showwarning) and wait until it is dismissed."""
+        return self.call(self._show_message, kind, title, text, parent)
+
+    def close_window(self, window):
+        """Destroy an action window and bring the main window back."""
+        self.post(self._close_window, window)
+
+    @staticmethod
+    def _append_status(status_text, line):
+        if status_text and status_text.winfo_exists():
+            status_text.text.configure(state='normal')
+            status_text.text.insert("end", line)
+            status_text.text.see("end")
+            status_text.text.configure(state='disabled')
+
+    @staticmethod
+    def _set_progress(progress_bar, value):
+        if progress_bar.winfo_exists():
+            if not progress_bar.winfo_manager():
+                progress_bar.pack(pady=10)
+            progress_bar["value"] = value
+
+    @staticmethod
+    def _hide_progress(progress_bar):
+        if progress_bar.winfo_exists():
+            progress_bar.pack_forget()
+
+    def _show_message(self, kind, title, text, parent):
+        if parent is None or not parent.winfo_exists():
+            parent = self.root
+        return getattr(messagebox, kind)(title, text, parent=parent)
+
+    @staticmethod
+    def _close_window(window):
+        if window.winfo_exists():
+            master = window.master
+            window.destroy()
+            master.deiconify()